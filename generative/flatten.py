@@ -1,12 +1,14 @@
-import itertools
 import logging
-from enum import Enum, auto
-from typing import Iterable, Tuple
+from enum import IntEnum, auto
+from itertools import chain, repeat
+from typing import Iterable, List, Tuple
 
+import numpy as np
+import shapely
 import shapely.geometry
-from more_itertools import peekable
 from shapely.geometry import (
     GeometryCollection,
+    LinearRing,
     LineString,
     MultiLineString,
     MultiPoint,
@@ -17,12 +19,22 @@ from shapely.geometry import (
 
 logger = logging.getLogger(name=__name__)
 
+# Shapely 2.0 can extract all of a geometry's coordinates in a single call.
+_HAS_GET_COORDINATES = hasattr(shapely, "get_coordinates")
+# Shapely 2.0 can also construct many geometries in a single call.
+_HAS_BATCH_CONSTRUCTORS = hasattr(shapely, "linestrings")
+# The number of top level LineStrings to construct at once, when supported by Shapely.
+_UNFLATTEN_BATCH_SIZE = 1024
 
-class PointTag(Enum):
+
+class PointTag(IntEnum):
     """Tags to mark points in a coordinate sequence.
 
     Note that each _END tag _must_ be the corresponding _BEGIN tag +1.
 
+    The tags are integers, so that hashing and comparing them, which happens for every tagged
+    point, is as cheap as it is for an int.
+
     Further, note that there is no tag for POINTs, because a point is any coordinate that's not
     wrapped between two _BEGIN and _END tags.
     """
@@ -50,6 +62,9 @@ class PointTag(Enum):
     COLLECTION_END = auto()
 
 
+# Map each _BEGIN tag to its _END tag, rather than constructing the _END tag for every geometry.
+_END_OF = {tag: PointTag(tag + 1) for tag in PointTag if tag.name.endswith("_BEGIN")}
+
 Geometry = shapely.geometry.base.BaseGeometry
 Tag = Tuple[PointTag]
 TaggedPoint = Tuple[Tuple[float], Tag]
@@ -62,184 +77,228 @@ def flatten(geometries: Iterable[Geometry]) -> TaggedPointSequence:
         yield from flatten_single(geometry)
 
 
-def flatten_single(geometry: Geometry, recursion_level=0) -> TaggedPointSequence:
-    """Recursively convert a single geometry to a sequence of tagged points."""
-    indent = "  " * recursion_level
-    logger.debug(indent + "Converting %s to tagged points.", geometry.geom_type)
-
-    if isinstance(geometry, Point):
-        yield geometry.coords[0], ()
-    elif isinstance(geometry, LineString):
-        yield from wrap_bare(geometry.coords, PointTag.LINESTRING_BEGIN)
-    elif isinstance(geometry, Polygon):
-
-        shell = wrap_bare(geometry.exterior.coords, PointTag.SHELL_BEGIN)
-        holes = itertools.chain.from_iterable(
-            wrap_bare(h.coords, PointTag.HOLE_BEGIN) for h in geometry.interiors
-        )
-        points = itertools.chain(shell, holes)
-        yield from wrap_tagged(points, PointTag.POLYGON_BEGIN)
-    elif isinstance(geometry, MultiPoint):
-        points = itertools.chain.from_iterable(
-            flatten_single(g, recursion_level + 1) for g in geometry.geoms
-        )
-        yield from wrap_tagged(points, PointTag.MULTIPOINT_BEGIN)
-    elif isinstance(geometry, MultiLineString):
-        points = itertools.chain.from_iterable(
-            flatten_single(g, recursion_level + 1) for g in geometry.geoms
-        )
-        yield from wrap_tagged(points, PointTag.MULTILINESTRING_BEGIN)
-    elif isinstance(geometry, MultiPolygon):
-        points = itertools.chain.from_iterable(
-            flatten_single(g, recursion_level + 1) for g in geometry.geoms
-        )
-        yield from wrap_tagged(points, PointTag.MULTIPOLYGON_BEGIN)
-    elif isinstance(geometry, GeometryCollection):
-        points = itertools.chain.from_iterable(
-            flatten_single(g, recursion_level + 1) for g in geometry.geoms
-        )
-        yield from wrap_tagged(points, PointTag.COLLECTION_BEGIN)
-    else:
-        logger.error(indent + "Unsupported geometry type '%s'", type(geometry))
-
-
-def wrap_bare(coords: Iterable[Tuple[float]], begin_tag: PointTag) -> TaggedPointSequence:
-    """Wrap the given coordinate seqence in the given tag type.
+def flatten_linestrings(linestrings: Iterable[LineString]) -> TaggedPointSequence:
+    """Convert the given LineStrings to a sequence of tagged points.
 
-    You pass in the _BEGIN tag, with the assumption that the _END tag is _BEGIN+1.
+    Equivalent to, but faster than, flatten() for inputs known to only contain LineStrings, like
+    the turtle paths from the L-System interpreter, because it skips dispatching on each geometry.
     """
-    yield coords[0], (begin_tag,)
-    for point in coords[1:-1]:
-        yield point, ()
-    yield coords[-1], (PointTag(begin_tag.value + 1),)
+    begin = (PointTag.LINESTRING_BEGIN,)
+    end = (PointTag.LINESTRING_END,)
+    for linestring in linestrings:
+        coords = _coordinates(linestring)
+        if not coords:
+            continue
+        yield coords[0], begin
+        yield from zip(coords[1:-1], repeat(()))
+        yield coords[-1], end
 
 
-def wrap_tagged(points: TaggedPointSequence, begin_tag: PointTag) -> TaggedPointSequence:
-    """Wrap an already tagged point sequence in another layer of _BEGIN and _END tags."""
-    # Assume there will always be at least two points.
-    first_point, first_tag = next(points)
-    first_tag = (begin_tag,) + first_tag
-    yield first_point, first_tag
+def flatten_single(geometry: Geometry, recursion_level=0) -> TaggedPointSequence:
+    """Recursively convert a single geometry to a sequence of tagged points."""
+    points = []
+    tags = []
+    _flatten_into(geometry, points, tags, recursion_level)
+    return zip(points, tags)
 
-    last_point, last_tag = next(points)
 
-    for point, tag in points:
-        yield last_point, last_tag
-        last_point, last_tag = point, tag
+def _flatten_into(geometry: Geometry, points: List, tags: List, recursion_level=0):
+    """Append the given geometry's points and their tags to the given lists.
 
-    last_tag = last_tag + (PointTag(begin_tag.value + 1),)
-    yield last_point, last_tag
+    Appending to flat lists, and tagging the first and last points of each geometry in place,
+    avoids pulling every point through a generator for each level of nesting. Multipart geometries
+    are traversed with an explicit stack, rather than recursing for each part.
+    """
+    # Each frame is either a (geometry, recursion level) pair to flatten, or a (_BEGIN tag, start
+    # index) pair to wrap a multipart geometry once all of its parts have been flattened.
+    stack = [(geometry, recursion_level)]
+    while stack:
+        geometry, level = stack.pop()
+        if isinstance(geometry, PointTag):
+            _wrap_in_place(tags, level, geometry)
+            continue
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(_indent(level) + "Converting %s to tagged points.", geometry.geom_type)
+
+        begin_tag = _MULTIPART_BEGIN.get(type(geometry))
+        if begin_tag is not None:
+            stack.append((begin_tag, len(tags)))
+            # Push the parts in reverse, so that they're popped in order.
+            stack.extend((g, level + 1) for g in reversed(list(geometry.geoms)))
+            continue
+
+        handler = _FLATTEN_DISPATCH.get(type(geometry))
+        if handler is None:
+            logger.error(_indent(level) + "Unsupported geometry type '%s'", type(geometry))
+            continue
+        handler(geometry, points, tags)
+
+
+# Geometries are rarely nested deeply, so share the indentation for log messages.
+_INDENTS = tuple("  " * level for level in range(32))
+
+
+def _indent(recursion_level: int) -> str:
+    """Get the indentation for log messages at the given recursion level."""
+    if recursion_level < len(_INDENTS):
+        return _INDENTS[recursion_level]
+    return "  " * recursion_level
+
+
+def _flatten_point(geometry: Point, points: List, tags: List):
+    points.append(geometry.coords[0])
+    tags.append(())
+
+
+def _flatten_linestring(geometry: LineString, points: List, tags: List):
+    _append_bare(_coordinates(geometry), PointTag.LINESTRING_BEGIN, points, tags)
+
+
+def _flatten_polygon(geometry: Polygon, points: List, tags: List):
+    start = len(tags)
+    _append_bare(_coordinates(geometry.exterior), PointTag.SHELL_BEGIN, points, tags)
+    for hole in geometry.interiors:
+        _append_bare(_coordinates(hole), PointTag.HOLE_BEGIN, points, tags)
+    _wrap_in_place(tags, start, PointTag.POLYGON_BEGIN)
+
+
+# Dispatch on the exact geometry type, rather than checking each type in turn.
+_FLATTEN_DISPATCH = {
+    Point: _flatten_point,
+    LineString: _flatten_linestring,
+    LinearRing: _flatten_linestring,
+    Polygon: _flatten_polygon,
+}
+_MULTIPART_BEGIN = {
+    MultiPoint: PointTag.MULTIPOINT_BEGIN,
+    MultiLineString: PointTag.MULTILINESTRING_BEGIN,
+    MultiPolygon: PointTag.MULTIPOLYGON_BEGIN,
+    GeometryCollection: PointTag.COLLECTION_BEGIN,
+}
+
+
+def _coordinates(geometry: Geometry) -> List[Tuple[float]]:
+    """Get the coordinates of the given LineString or LinearRing."""
+    if _HAS_GET_COORDINATES:
+        coords = shapely.get_coordinates(geometry, include_z=geometry.has_z)
+        return list(map(tuple, coords.tolist()))
+    return list(geometry.coords)
+
+
+def _append_bare(coords: List[Tuple[float]], begin_tag: PointTag, points: List, tags: List):
+    """Append the given coordinate sequence, tagging its first and last points."""
+    if not coords:
+        return
+    start = len(tags)
+    points.extend(coords)
+    tags.extend([()] * len(coords))
+    tags[start] = (begin_tag,)
+    tags[-1] = (_END_OF[begin_tag],)
+
+
+def _wrap_in_place(tags: List, start: int, begin_tag: PointTag):
+    """Wrap the tags from the given start index in another layer of _BEGIN and _END tags."""
+    if start == len(tags):
+        return
+    tags[start] = (begin_tag,) + tags[start]
+    tags[-1] = tags[-1] + (_END_OF[begin_tag],)
 
 
 def unflatten(points: TaggedPointSequence) -> Iterable[Geometry]:
-    """Convert the sequence of tagged points back into a sequence of geometries."""
-    # We need to be able to peek at the next point in the sequence without consuming it.
-    points = peekable(points)
-    while points:
-        geometry, _ = unflatten_single(points)
-        yield geometry
+    """Convert the sequence of tagged points back into a sequence of geometries.
 
+    Each _BEGIN tag opens a new (possibly nested) geometry, and each _END tag closes the innermost
+    open geometry, and adds it to the geometry containing it. So the geometries can be rebuilt in a
+    single pass with an explicit stack of open geometries, rather than recursing for each level of
+    nesting.
 
-def unflatten_single(points: TaggedPointSequence, recursion_level=0) -> Geometry:
-    """Get the next geometry from the given sequence of tagged points.
+    Top level LineStrings, which is everything the L-System interpreter outputs, are constructed
+    in batches when Shapely supports it.
+    """
+    # The open geometries, as (begin tag, parts) pairs. The parts are coordinates for coordinate
+    # sequences, rings for polygons, and geometries for multipart geometries.
+    stack: List[Tuple[PointTag, List]] = []
+    # The coordinates of the top level LineStrings waiting to be constructed.
+    pending: List[List[Tuple[float]]] = []
+    for point, tags in points:
+        end_tags = []
+        for tag in tags:
+            if tag in _END_OF:
+                stack.append((tag, []))
+            else:
+                end_tags.append(tag)
+
+        if not stack:
+            if pending:
+                yield from _linestrings(pending)
+                pending = []
+            yield Point(point)
+            continue
+        begin_tag, parts = stack[-1]
+        parts.append(point if begin_tag in _COORDINATE_SEQUENCES else Point(point))
+
+        for end_tag in end_tags:
+            begin_tag, parts = stack.pop() if stack else (None, None)
+            if end_tag is not _END_OF.get(begin_tag):
+                # Python 3.11+ formats IntEnum members as plain ints, so use their names.
+                begin_name = begin_tag.name if begin_tag is not None else None
+                raise ValueError(f"Unexpected {end_tag.name} for point {point} after {begin_name}")
+            if not stack and begin_tag is PointTag.LINESTRING_BEGIN and _HAS_BATCH_CONSTRUCTORS:
+                pending.append(parts)
+                if len(pending) >= _UNFLATTEN_BATCH_SIZE:
+                    yield from _linestrings(pending)
+                    pending = []
+                continue
+
+            geometry = _UNFLATTEN_DISPATCH[begin_tag](parts)
+            if stack:
+                stack[-1][1].append(geometry)
+            else:
+                # Preserve the order of the geometries.
+                if pending:
+                    yield from _linestrings(pending)
+                    pending = []
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Unflattened %s", geometry.wkt)
+                yield geometry
+
+    if pending:
+        yield from _linestrings(pending)
+    if stack:
+        logger.error("Unterminated geometries %s", [begin_tag for begin_tag, _ in stack])
+
+
+def _linestrings(coordinate_sequences: List[List[Tuple[float]]]) -> List[LineString]:
+    """Construct a LineString from each of the given coordinate sequences in a single call."""
+    try:
+        coords = np.array(list(chain.from_iterable(coordinate_sequences)), dtype=float)
+        indices = np.repeat(
+            np.arange(len(coordinate_sequences)), list(map(len, coordinate_sequences))
+        )
+        linestrings = shapely.linestrings(coords, indices=indices)
+    except (ValueError, shapely.errors.GEOSException):
+        # A mix of 2D and 3D coordinates can't be constructed in one go, and invalid LineStrings
+        # should raise the same errors as they would on their own.
+        linestrings = list(map(LineString, coordinate_sequences))
 
-    All nested geometries will be reconstructed and returned.
-    In order to nicely handle the recursive cases, this method, along with __unflatten_multipart(),
-    and __unwrap_coordinate_sequence() take in their recursion level to facilitate nicer looking
-    logging, and return any remaining tags left to unwrap.
+    if logger.isEnabledFor(logging.DEBUG):
+        for linestring in linestrings:
+            logger.debug("Unflattened %s", linestring.wkt)
+    return linestrings
 
-    These remaining tags only occur when unflattening a multipart geometry. That is, a MULTI*
-    geometry, a POLYGON, or a GEOMETRYCOLLECTION, but note that __unflatten_multipart() internally
-    calls unflatten_single() to get each component of a multipart geometry.
-    """
-    indent = "  " * recursion_level
-    point, tags = points.peek()
-
-    first_tag, _ = __unwrap_first_tag(tags)
-    if (
-        not first_tag
-        or first_tag == PointTag.MULTIPOINT_END
-        or first_tag == PointTag.COLLECTION_END
-    ):
-        logger.debug(indent + "Base case: Point%s", point)
-        point, tags = next(points)
-        return Point(point), tags
-    if first_tag in (PointTag.LINESTRING_BEGIN, PointTag.SHELL_BEGIN, PointTag.HOLE_BEGIN):
-        logger.debug(indent + "Base case: %s", points.peek())
-        return __unflatten_coordinate_sequence(points, recursion_level + 1)
-
-    logger.debug(indent + "Getting multi-part geometry: %s", points.peek())
-    geometry, remaining = __unflatten_multipart(points, recursion_level + 1)
-    logger.debug(indent + "Got multi-part geometry: %s", geometry.wkt)
-    return geometry, remaining
-
-
-def __unflatten_multipart(points: TaggedPointSequence, recursion_level=0) -> Geometry:
-    """Recursively handle the multipart case for unflatten_single().
-
-    The multipart case is separate because it requires recursion to unwrap nested tags that result
-    from multipart geometries (where a single point could be the begin to multiple geometries, or
-    and end to multiple).
-    """
-    indent = "  " * recursion_level
-    point, tags = next(points)
-
-    # Unwrap outer tag, and _get_geometry() until we find the matching end tag.
-    begin_tag, remaining_tags = __unwrap_first_tag(tags)
-    end_tag = PointTag(begin_tag.value + 1)
-    points.prepend((point, remaining_tags))
-
-    outer_tag = None
-    primitives = []
-    while outer_tag != end_tag:
-        logger.debug(indent + "Getting primitive: %s", points.peek())
-        primitive, remaining_tags = unflatten_single(points, recursion_level + 1)
-        logger.debug(indent + "Got primitive %s", primitive.wkt)
-        primitives.append(primitive)
-        outer_tag, remaining_tags = __unwrap_first_tag(remaining_tags)
-
-    # Reconstruct the multi-part geometry from the primitives we parsed.
-    if begin_tag == PointTag.POLYGON_BEGIN:
-        shell = primitives.pop(0)
-        holes = primitives
-        return Polygon(shell, holes), remaining_tags
-    if begin_tag == PointTag.MULTIPOINT_BEGIN:
-        return MultiPoint(primitives), remaining_tags
-    if begin_tag == PointTag.MULTILINESTRING_BEGIN:
-        return MultiLineString(primitives), remaining_tags
-    if begin_tag == PointTag.MULTIPOLYGON_BEGIN:
-        return MultiPolygon(primitives), remaining_tags
-    if begin_tag == PointTag.COLLECTION_BEGIN:
-        return GeometryCollection(primitives), remaining_tags
-
-
-def __unwrap_first_tag(tags: Tag) -> Tuple[PointTag, Tag]:
-    """Unwrap the first and any remaining tags."""
-    if not tags:
-        return (), ()
-    return tags[0], tags[1:]
-
-
-def __unflatten_coordinate_sequence(
-    points: TaggedPointSequence, recursion_level=0
-) -> Tuple[Geometry, Tag]:
-    """Unwrap a coordinate sequence as a LINESTRING.
-
-    This can also be used to unwrap polygon shells and holes.
-    TODO: There has _got_ to be a better implementation than this.
-    """
-    indent = "  " * recursion_level
-    point, tag = next(points)
-    logger.debug(indent + "Unwrapping CS Point%s", point)
-    unwrapped = [point]
-
-    point, tag = next(points)
-    logger.debug(indent + "Unwrapping CS Point%s", point)
-    while not tag:
-        unwrapped.append(point)
-        point, tag = next(points)
-    logger.debug(indent + "Unwrapping CS Point%s", point)
-    unwrapped.append(point)
-
-    _, remaining_tags = __unwrap_first_tag(tag)
-    return LineString(unwrapped), remaining_tags
+
+# Shells and holes are passed to their Polygon as coordinate sequences, not LinearRings.
+_COORDINATE_SEQUENCES = frozenset(
+    [PointTag.LINESTRING_BEGIN, PointTag.SHELL_BEGIN, PointTag.HOLE_BEGIN]
+)
+_UNFLATTEN_DISPATCH = {
+    PointTag.LINESTRING_BEGIN: LineString,
+    PointTag.SHELL_BEGIN: lambda coords: coords,
+    PointTag.HOLE_BEGIN: lambda coords: coords,
+    PointTag.POLYGON_BEGIN: lambda rings: Polygon(rings[0], rings[1:]),
+    PointTag.MULTIPOINT_BEGIN: MultiPoint,
+    PointTag.MULTILINESTRING_BEGIN: MultiLineString,
+    PointTag.MULTIPOLYGON_BEGIN: MultiPolygon,
+    PointTag.COLLECTION_BEGIN: GeometryCollection,
+}
@@ -1,11 +1,10 @@
+import bisect
 import itertools
 import logging
 import random
 from dataclasses import dataclass
-from typing import Iterable, List, NewType, Set, Tuple, Union
+from typing import Dict, Iterable, List, NewType, Sequence, Set, Tuple, Union
 
-import numpy as np
-from more_itertools import peekable
 from multidict import MultiDict
 
 logger = logging.getLogger(__name__)
@@ -14,12 +13,25 @@ Number = Union[int, float]
 TokenName = NewType("TokenName", str)
 
 
-@dataclass
+@dataclass(frozen=True)
 class Token:
-    """A token in the language defined by the L-System grammar."""
+    """A token in the language defined by the L-System grammar.
+
+    L-System strings grow to millions of tokens, so tokens use __slots__ rather than carrying
+    around a __dict__ each. Tokens are immutable, and hashable.
+    """
 
+    __slots__ = ("name",)
     name: str
 
+    # Frozen dataclasses with __slots__ can't be pickled or copied by default, because restoring
+    # the slots goes through the __setattr__ that freezing overrides.
+    def __getstate__(self):
+        return (self.name,)
+
+    def __setstate__(self, state):
+        object.__setattr__(self, "name", state[0])
+
 
 @dataclass
 class RuleMapping:
@@ -35,15 +47,6 @@ class RuleMapping:
     right_context: Union[None, Token] = None
 
 
-def triplewise(iterable):
-    """Iterate over the given iterable in triples."""
-    a, b, c = itertools.tee(iterable, 3)
-    next(b, None)
-    next(c, None)
-    next(c, None)
-    return zip(a, b, c)
-
-
 class LSystemGrammar:
     """A context-sensitive and stochastic Lindenmayer System grammar parser.
 
@@ -87,13 +90,60 @@ class LSystemGrammar:
         """
         self.ignore: Set[TokenName] = ignore if ignore is not None else set()
         self.rules: MultiDict[TokenName, RuleMapping] = rules
+        # The rules matching each (token, left context, right context) triple, and their cumulative
+        # probabilities, filled in the first time each triple is seen. Grammars have few tokens,
+        # but their strings are long.
+        self._rule_index: Dict[
+            Tuple[TokenName, TokenName, TokenName], Tuple[Tuple[RuleMapping], List[Number]]
+        ] = {}
+
+        # Context-free, deterministic grammars of single character tokens can be rewritten as
+        # strings, without considering each token's context.
+        self._string_productions = self._get_string_productions()
 
         self.seed = seed if seed is not None else random.randint(0, 2 ** 32 - 1)
-        np.random.seed(self.seed)
+        self.rng = random.Random(self.seed)
         logger.info(f"Using random seed: {self.seed}")
 
-    def pick_rule(self, rules: List[RuleMapping], token, left_ctx, right_ctx) -> RuleMapping:
-        """Pick the right rule based off the probability values or the parametric condition."""
+    def _get_string_productions(self) -> Union[None, Dict[str, str]]:
+        """Get each token's production as a string, if the whole grammar can be rewritten as one.
+
+        Returns None if any token has more than one rule, or a rule with context, or any of the
+        tokens are longer than a single character.
+        """
+        productions = {}
+        for name in self.rules.keys():
+            rules = self.rules.getall(name)
+            if len(rules) != 1:
+                return None
+            rule = rules[0]
+            if rule.left_context is not None or rule.right_context is not None:
+                return None
+            production = "".join(token.name for token in rule.production)
+            if len(name) != 1 or len(production) != len(rule.production):
+                return None
+            productions[name] = production
+
+        # Map every token to its production, including those without a rule, so that the table can
+        # be indexed without checking for missing tokens.
+        for production in list(productions.values()):
+            for c in production:
+                productions.setdefault(c, c)
+        return productions
+
+    def pick_rule(
+        self,
+        rules: List[RuleMapping],
+        token,
+        left_ctx,
+        right_ctx,
+        cumulative_probabilities: List[Number] = None,
+    ) -> RuleMapping:
+        """Pick the right rule based off the probability values or the parametric condition.
+
+        :param cumulative_probabilities: The cumulative sum of the rule probabilities, if it's
+            already been computed.
+        """
         # If there's not choice, no need to make it a random choice.
         if len(rules) == 1:
             return rules[0]
@@ -102,7 +152,42 @@ class LSystemGrammar:
             if rule.probability is None:
                 return rule
 
-        return np.random.choice(rules, p=[r.probability for r in rules])
+        if cumulative_probabilities is None:
+            cumulative_probabilities = self._cumulative_probabilities(rules)
+        # Scale by the total, in case the probabilities don't quite sum to one.
+        choice = self.rng.random() * cumulative_probabilities[-1]
+        return rules[bisect.bisect(cumulative_probabilities, choice)]
+
+    @staticmethod
+    def _cumulative_probabilities(rules: Sequence[RuleMapping]) -> List[Number]:
+        """Get the cumulative sum of the given rule probabilities, if they're all given."""
+        if not rules or any(r.probability is None for r in rules):
+            return None
+        return list(itertools.accumulate(r.probability for r in rules))
+
+    def _index_rules(
+        self, key: Tuple[TokenName, TokenName, TokenName]
+    ) -> Tuple[Tuple[RuleMapping], List[Number]]:
+        """Add the rules matching the given (token, left context, right context) to the index."""
+        rules = self._matching_rules(*key)
+        entry = self._rule_index[key] = (rules, self._cumulative_probabilities(rules))
+        return entry
+
+    def _matching_rules(
+        self, name: TokenName, left_name: TokenName, right_name: TokenName
+    ) -> Tuple[RuleMapping]:
+        """Get the rules for the given token that match the given context, in order."""
+        # Filter rules by context. Either there's no context in the rule, or the context matches
+        # Note the edge cases at the ends of the string where there is only context to one side.
+        return tuple(
+            r
+            for r in self.rules.getall(name, ())
+            # Either there is no left context in the rule, or the left context is available and
+            # matches.
+            if (r.left_context is None or r.left_context.name == left_name)
+            # Likewise for the right context.
+            and (r.right_context is None or r.right_context.name == right_name)
+        )
 
     def apply_rules(
         self, token: Token, left_ctx: Token = None, right_ctx: Token = None
@@ -112,72 +197,133 @@ class LSystemGrammar:
         Note that the left and right context are optional to facilitate the edge cases for the
         first and last tokens in the string.
         """
-        # Get all rules that match the given token
-        if token.name in self.rules:
-            rules = self.rules.getall(token.name)
-        else:
-            logger.debug(f"No rules found for {token}")
-            return (token,)
-
-        # Filter rules by context. Either there's no context in the rule, or the context matches
-        # Note the edge cases at the ends of the string where there is only context to one side.
-
-        # Filter by left context
-        rules = [
-            r
-            for r in rules
-            # Either there is no left context in the rule
-            if r.left_context is None
-            # Or there is, and the left context is available and matches.
-            or (left_ctx is not None and r.left_context.name == left_ctx.name)
-        ]
-        # Filter by right context
-        rules = [
-            r
-            for r in rules
-            # Either there is no right context in the rule
-            if r.right_context is None
-            # Or there is, and the right context is available and matches.
-            or (right_ctx is not None and r.right_context.name == right_ctx.name)
-        ]
+        left_name = left_ctx.name if left_ctx is not None else None
+        right_name = right_ctx.name if right_ctx is not None else None
+        key = (token.name, left_name, right_name)
+        entry = self._rule_index.get(key)
+        if entry is None:
+            entry = self._index_rules(key)
+        rules, cumulative_probabilities = entry
 
         # If we don't have a matching rule, just passthrough the token.
         if not rules:
-            logger.debug(f"No rule matching context found for {token}. Passing through.")
+            logger.debug("No rule matching context found for %s. Passing through.", token)
             return (token,)
 
         # Of the remaining rules, pick one randomly.
-        rule = self.pick_rule(rules, token, left_ctx, right_ctx)
-        logger.debug(f"Applying rule {token} -> {rule.production}")
+        rule = self.pick_rule(rules, token, left_ctx, right_ctx, cumulative_probabilities)
+        logger.debug("Applying rule %s -> %s", token, rule.production)
         return rule.production
 
-    def rewrite(self, tokens: Iterable[Token]) -> Iterable[Token]:
-        """Apply the production rules to the given string to rewrite it."""
-        tokens = peekable(tokens)
+    def rewrite(self, tokens: Sequence[Token]) -> List[Token]:
+        """Apply the production rules to the given string to rewrite it.
+
+        This is apply_rules() specialized for rewriting a whole string. It works with the token
+        names directly, and skips picking a rule when there's only one to pick from. The whole
+        rewritten string is built at once, because extending a list is much cheaper than yielding
+        each token.
+        """
+        if not isinstance(tokens, Sequence):
+            tokens = list(tokens)
+        names = [token.name for token in tokens]
+        ignore = self.ignore
+        rule_index = self._rule_index
         left = None
-        right = None
-
-        for token in tokens:
-            # Peek until you find a right token that isn't ignored.
-            # The peekable indices are centered on the current item.
-            for i in itertools.count(0):
-                try:
-                    if tokens[i].name not in self.ignore:
-                        right = tokens[i]
-                        break
-                except IndexError:
-                    right = None
-                    break
-
-            for replacement in self.apply_rules(token, left_ctx=left, right_ctx=right):
-                yield replacement
+        left_name = None
+        # Find the right context of every token with a single reverse scan, carrying the index of
+        # the last token that isn't ignored.
+        length = len(names)
+        right_indices = [length] * length
+        right_names = [None] * length
+        right_index = length
+        right_name = None
+        for i in range(length - 1, -1, -1):
+            right_indices[i] = right_index
+            right_names[i] = right_name
+            if names[i] not in ignore:
+                right_index = i
+                right_name = names[i]
+
+        rewritten = []
+        append = rewritten.append
+        extend = rewritten.extend
+
+        for i, (name, right_name) in enumerate(zip(names, right_names)):
+            key = (name, left_name, right_name)
+            entry = rule_index.get(key)
+            if entry is None:
+                entry = self._index_rules(key)
+            rules, cumulative_probabilities = entry
+
+            token = tokens[i]
+            if not rules:
+                # If we don't have a matching rule, just passthrough the token.
+                append(token)
+            elif len(rules) == 1:
+                extend(rules[0].production)
+            else:
+                right_index = right_indices[i]
+                right = tokens[right_index] if right_index < length else None
+                rule = self.pick_rule(rules, token, left, right, cumulative_probabilities)
+                extend(rule.production)
 
             # Update the left context for the next iteration.
-            if token.name not in self.ignore:
+            if name not in ignore:
                 left = token
+                left_name = name
+
+        return rewritten
 
     def loop(self, axiom: Iterable[Token], n: int = 1) -> Iterable[Token]:
         """Apply the productions rules n times to the given axiom, and return the result."""
+        axiom = list(axiom)
+        if self._string_productions is not None and all(len(t.name) == 1 for t in axiom):
+            return self._loop_string(axiom, n)
+
         for _ in range(n):
             axiom = self.rewrite(axiom)
         return axiom
+
+    def _loop_string(self, axiom: List[Token], n: int) -> List[Token]:
+        """Apply the context-free production rules n times to the given single-character tokens.
+
+        Rewriting a string is much faster than rewriting a list of tokens, and a character takes up
+        far less memory than a reference to a Token.
+
+        Without context, each token always expands to the same string. So rather than rewriting the
+        whole string n times, build each token's expansion after i iterations from the expansions
+        after i - 1 iterations. Only the tokens reachable from the axiom are expanded, and the final
+        string is joined from the expansions after n - 1 iterations, so no token's full expansion is
+        kept alongside the final string. Each of those expansions can still be as large as a
+        fraction of the final string, so the peak memory use is somewhat more than its size.
+        """
+        productions = dict(self._string_productions)
+        string = "".join(token.name for token in axiom)
+        for c in string:
+            productions.setdefault(c, c)
+
+        # Find the tokens reachable from the axiom.
+        reachable = set(string)
+        frontier = list(reachable)
+        while frontier:
+            for c in productions[frontier.pop()]:
+                if c not in reachable:
+                    reachable.add(c)
+                    frontier.append(c)
+
+        if n > 0:
+            expansions = {c: c for c in reachable}
+            for _ in range(n - 1):
+                expansions = {
+                    c: "".join(map(expansions.__getitem__, productions[c])) for c in reachable
+                }
+            # Rewrite the axiom once, and then expand each token of the result n - 1 times.
+            string = "".join(map(productions.__getitem__, string))
+            string = "".join(map(expansions.__getitem__, string))
+            del expansions
+
+        # Reuse the existing tokens, rather than creating a new Token for every character.
+        tokens = {token.name: token for token in axiom}
+        for rule in self.rules.values():
+            tokens.update((token.name, token) for token in rule.production)
+        return list(map(tokens.__getitem__, string))
@@ -1,11 +1,14 @@
 import io
 import logging
+from functools import partial
 from typing import Iterable, NewType
 
 import numpy as np
+import shapely
+from more_itertools import chunked
 from shapely.geometry import LineString
 
-from .turtle import Turtle
+from .turtle import Quaternion, Turtle
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +16,9 @@ Token = NewType("Token", str)
 Tokens = Iterable[Token]
 Lines = Iterable[LineString]
 
+# Shapely 2.0 can construct many geometries in a single call.
+_HAS_BATCH_CONSTRUCTORS = hasattr(shapely, "linestrings")
+
 
 class LSystemInterpeter:
     """Interpret L-System strings as turtle commands.
@@ -31,19 +37,38 @@ class LSystemInterpeter:
 
     commandsets = frozenset(["default"])
 
-    def __init__(self, commandset, stepsize, angle):
-        """Initialize an L-System interpreter with the given commandset and turtle config."""
+    def __init__(self, commandset, stepsize, angle, batch_size=1024):
+        """Initialize an L-System interpreter with the given commandset and turtle config.
+
+        :param batch_size: The number of lines to construct at once, when supported by Shapely.
+            Lines are only yielded once a whole batch has been interpreted, so smaller batches
+            trade throughput for latency.
+        """
         if commandset not in self.commandsets:
             raise ValueError(f"{commandset=} not in {self.commandsets}.")
         self.commandset = commandset
+        self.batch_size = batch_size
         self.turtle = Turtle()
         self.stepsize = stepsize
         self.angle = angle
         self.drawing = True
         self.orientation_changed = False
-        self.active_line = []
+        # The vertices of the line being drawn, stored contiguously and grown geometrically.
+        self._active_line = np.empty((64, 3))
+        self._active_length = 0
         self.stack = []
 
+    @property
+    def angle(self):
+        """The angle, in degrees, to turn by for each rotation command."""
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+        self._angle = value
+        # The rotations are built from the angle, so rebuild them whenever it changes.
+        self._default_dispatch = self._build_default_dispatch()
+
     def tokenize(self, commands: io.TextIOWrapper) -> Tokens:
         """Tokenize the given input using the configured commandset."""
         if self.commandset == "default":
@@ -53,101 +78,151 @@ class LSystemInterpeter:
     @staticmethod
     def _tokenize_default(commands: io.TextIOWrapper) -> Tokens:
         # The default set of commands are each a single character.
-        # So tokenizing is really easy. Yay.
-        while True:
-            chunk = commands.read(256)
-            if not chunk:
-                break
-            for char in chunk:
-                yield char
+        # So tokenizing is really easy. Yay. Iterating over a string yields its characters, so the
+        # chunks read from the input can be used as-is, and the interpreter iterates over each
+        # chunk in C, rather than resuming a generator for every token.
+        return iter(partial(commands.read, io.DEFAULT_BUFFER_SIZE), "")
 
     def interpret(self, tokens: Tokens) -> Lines:
-        """Interpret the given tokens as 3D Turtle commands."""
-        for line in self._interpret(tokens):
-            if line is not None:
-                yield line
-
-    def _interpret(self, tokens: Tokens) -> Lines:
+        """Interpret the given tokens as 3D Turtle commands.
+
+        With Shapely 2.0, the lines are constructed and yielded in batches of batch_size, so the
+        first line is only yielded once batch_size lines have been drawn, or the tokens run out.
+        """
+        lines = (line for line in self._interpret(tokens) if line is not None)
+        if not _HAS_BATCH_CONSTRUCTORS:
+            yield from map(LineString, lines)
+            return
+
+        # Build the lines in batches to amortize the cost of constructing each geometry. Each batch
+        # is yielded as soon as it's built, rather than waiting for the whole input.
+        for batch in chunked(lines, self.batch_size):
+            coords = np.concatenate(batch)
+            indices = np.repeat(np.arange(len(batch)), [len(line) for line in batch])
+            yield from shapely.linestrings(coords, indices=indices)
+
+    def _interpret(self, tokens: Tokens) -> Iterable[np.ndarray]:
         if self.commandset == "default":
             yield from self._interpret_default(tokens)
         else:
             raise ValueError(f"commandset '{self.commandset}' unsupported")
 
-    def _flush_active_line(self) -> LineString:
-        if not self.active_line or not self.drawing:
+    def _flush_active_line(self) -> np.ndarray:
+        if not self._active_length or not self.drawing:
             return None
 
         self._append_position()
-        if len(self.active_line) < 2:
-            logger.error(f"Tried to flush incomplete line {self.active_line}")
+        if self._active_length < 2:
+            logger.error(
+                f"Tried to flush incomplete line {self._active_line[:self._active_length].tolist()}"
+            )
             return None
 
-        line = LineString(self.active_line)
-        self.active_line = []
+        # The buffer is reused for the next line, so the flushed line must be a copy.
+        line = self._active_line[: self._active_length].copy()
+        self._active_length = 0
 
-        logger.debug(f"Flushing active line {line.wkt}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Flushing active line %s", line.tolist())
         return line
 
+    def _record_position(self):
+        """Append the turtle's current position to the active line."""
+        if self._active_length == len(self._active_line):
+            grown = np.empty((2 * len(self._active_line), 3))
+            grown[: self._active_length] = self._active_line
+            self._active_line = grown
+        self._active_line[self._active_length] = self.turtle.coordinates
+        self._active_length += 1
+
     def _append_position(self):
-        # If any coordinate isn't equal to the last recorded position.
-        if self.drawing and (
-            not self.active_line or np.any(self.active_line[-1] != self.turtle.position)
+        if not self.drawing:
+            return
+        # If any coordinate isn't equal to the last recorded position. Comparing tuples is much
+        # cheaper than comparing such small arrays.
+        if (
+            not self._active_length
+            or tuple(self._active_line[self._active_length - 1].tolist()) != self.turtle.coordinates
         ):
-            self.active_line.append(self.turtle.position)
-
-    def _interpret_default(self, tokens: Tokens):
-        for token in tokens:
-            # Step forward and draw
-            if token in {"F", "G"}:
-                if self.drawing and (len(self.active_line) == 0 or self.orientation_changed):
-                    logger.debug(
-                        "Making first step forwards since last flush or orientation change. pos: %s",
-                        self.turtle.position,
-                    )
-                    self.orientation_changed = False
-                    self.active_line.append(self.turtle.position)
-                self.turtle.forward(self.stepsize)
-            # Step forward without drawing
-            elif token in {"f", "g"}:
-                yield self._flush_active_line()
-                self.turtle.forward(self.stepsize)
-            elif token == "-":
-                self.orientation_changed = True
-                self.turtle.yaw(-self.angle)
-            elif token == "+":
-                self.orientation_changed = True
-                self.turtle.yaw(+self.angle)
-            elif token == "v":
-                self.orientation_changed = True
-                self.turtle.pitch(-self.angle)
-            elif token == "^":
-                self.orientation_changed = True
-                self.turtle.pitch(+self.angle)
-            elif token == "<":
-                self.orientation_changed = True
-                self.turtle.roll(-self.angle)
-            elif token == ">":
-                self.orientation_changed = True
-                self.turtle.roll(+self.angle)
-            elif token == "|":
-                self.orientation_changed = True
-                # TODO: Determine if we should also roll 180deg.
-                self.turtle.yaw(180)
-            # Turn drawing off
-            elif token == "d":
-                yield self._flush_active_line()
-                self.drawing = False
-            # Turn drawing back on
-            elif token == "D":
-                self.drawing = True
-            elif token == "[":
-                self.stack.append((self.turtle.position, self.turtle.rotation))
-                logger.debug("pushing turtle position, orientation.")
-            elif token == "]":
-                yield self._flush_active_line()
-                logger.debug("popping turtle position, orientation.")
-                if not self.stack:
-                    logger.warning("Stack empty. Can't pop.")
-                else:
-                    self.turtle.position, self.turtle.rotation = self.stack.pop()
+            self._record_position()
+
+    def _interpret_default(self, tokens: Tokens) -> Iterable[np.ndarray]:
+        # Each handler returns the line it flushed, if any.
+        # Bind the lookup to a local once, rather than looking it up for every token.
+        get_handler = self._default_dispatch.get
+        # The default commands are single characters, so the tokens may be given either one at a
+        # time, or in chunks of many tokens as by tokenize(). A single character iterates over
+        # itself.
+        for chunk in tokens:
+            for token in chunk:
+                handler = get_handler(token)
+                if handler is not None:
+                    line = handler()
+                    if line is not None:
+                        yield line
         yield self._flush_active_line()
+
+    def _build_default_dispatch(self):
+        """Map each token in the default commandset to its handler."""
+        return {
+            "F": self._step_draw,
+            "G": self._step_draw,
+            "f": self._step_no_draw,
+            "g": self._step_no_draw,
+            # Build each rotation once for the current angle, rather than once per token.
+            "-": partial(self._rotate, Turtle.yaw_rotation(-self.angle)),
+            "+": partial(self._rotate, Turtle.yaw_rotation(+self.angle)),
+            "v": partial(self._rotate, Turtle.pitch_rotation(-self.angle)),
+            "^": partial(self._rotate, Turtle.pitch_rotation(+self.angle)),
+            "<": partial(self._rotate, Turtle.roll_rotation(-self.angle)),
+            ">": partial(self._rotate, Turtle.roll_rotation(+self.angle)),
+            # TODO: Determine if we should also roll 180deg.
+            "|": partial(self._rotate, Turtle.yaw_rotation(180)),
+            "d": self._draw_off,
+            "D": self._draw_on,
+            "[": self._push,
+            "]": self._pop,
+        }
+
+    def _step_draw(self):
+        """Step forward and draw."""
+        if self.drawing and (self._active_length == 0 or self.orientation_changed):
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "Making first step forwards since last flush or orientation change. pos: %s",
+                    self.turtle.position,
+                )
+            self.orientation_changed = False
+            self._record_position()
+        self.turtle.forward(self.stepsize)
+
+    def _step_no_draw(self) -> np.ndarray:
+        """Step forward without drawing."""
+        line = self._flush_active_line()
+        self.turtle.forward(self.stepsize)
+        return line
+
+    def _rotate(self, rotation: Quaternion):
+        self.orientation_changed = True
+        self.turtle.rotate(rotation)
+
+    def _draw_off(self) -> np.ndarray:
+        line = self._flush_active_line()
+        self.drawing = False
+        return line
+
+    def _draw_on(self):
+        self.drawing = True
+
+    def _push(self):
+        self.stack.append((self.turtle.coordinates, self.turtle.quaternion))
+        logger.debug("pushing turtle position, orientation.")
+
+    def _pop(self) -> np.ndarray:
+        line = self._flush_active_line()
+        logger.debug("popping turtle position, orientation.")
+        if not self.stack:
+            logger.warning("Stack empty. Can't pop.")
+        else:
+            self.turtle.coordinates, self.turtle.quaternion = self.stack.pop()
+        return line
@@ -1,20 +1,93 @@
-from typing import Set, Tuple
+import re
+from typing import Dict, List, Set, Tuple
 
 from multidict import MultiDict
-from pyparsing import (
-    Literal,
-    OneOrMore,
-    Optional,
-    ParserElement,
-    White,
-    Word,
-    alphanums,
-    delimitedList,
-    pyparsing_common,
-)
 
 from .grammar import RuleMapping, Token, TokenName
 
+# The turtle commands that are valid tokens in addition to the alphanumeric tokens.
+_OPERATORS = r"[\^v<>\-+\[\]|]"
+_TOKEN_RE = re.compile(r"[A-Za-z0-9]|" + _OPERATORS)
+_LONG_TOKEN_RE = re.compile(r"[A-Za-z0-9]+|" + _OPERATORS)
+# Probabilities are real numbers with a decimal point, like 0.5 or .5, but not 1 or 1e-1.
+_PROBABILITY_RE = re.compile(r"\d+\.\d*|\.\d+")
+
+
+def _check_scanned(tokens: List[str], text: str):
+    """Ensure the given tokens account for every character in the text they were scanned from."""
+    if "".join(tokens) != "".join(text.split()):
+        raise ValueError(f"Failed to parse tokens '{text.strip()}'")
+
+
+def _scan_tokens(text: str, long_tokens: bool) -> List[str]:
+    """Split the given whitespace separated text into tokens."""
+    if long_tokens:
+        tokens = text.split()
+        for token in tokens:
+            if not _LONG_TOKEN_RE.fullmatch(token):
+                raise ValueError(f"Invalid token '{token}' in '{text.strip()}'")
+        return tokens
+    tokens = _TOKEN_RE.findall(text)
+    _check_scanned(tokens, text)
+    return tokens
+
+
+def _scan_lhs(text: str, long_tokens: bool) -> Dict[str, str]:
+    """Split the lhs of a rule into the token and its optional left and right contexts."""
+    tokens = (_LONG_TOKEN_RE if long_tokens else _TOKEN_RE).findall(text)
+    _check_scanned(tokens, text)
+    # The context markers are themselves valid tokens, so they're found by position.
+    if len(tokens) == 1:
+        return {"lhs": tokens[0]}
+    if len(tokens) == 3 and tokens[1] == "<":
+        return {"left_context": tokens[0], "lhs": tokens[2]}
+    if len(tokens) == 3 and tokens[1] == ">":
+        return {"lhs": tokens[0], "right_context": tokens[2]}
+    if len(tokens) == 5 and tokens[1] == "<" and tokens[3] == ">":
+        return {"left_context": tokens[0], "lhs": tokens[2], "right_context": tokens[4]}
+    raise ValueError(f"Failed to parse rule lhs '{text}'")
+
+
+def _scan(rule: str, long_tokens: bool) -> Dict:
+    """Parse the given rule (with commas already replaced by whitespace) into textual tokens."""
+    if rule.startswith("#"):
+        if not rule.startswith("#ignore"):
+            raise ValueError(f"Failed to parse directive '{rule}'")
+        tokens = rule[len("#ignore") :].lstrip()
+        if tokens.startswith(":"):
+            tokens = tokens[1:]
+        ignore = _scan_tokens(tokens, long_tokens)
+        if not ignore:
+            raise ValueError(f"Directive '{rule}' has an empty ignore list")
+        return {"ignore": ignore}
+
+    lhs, arrow, rhs = rule.partition("->")
+    if not arrow:
+        raise ValueError(f"Failed to find '->' in rule '{rule}'")
+
+    lhs, colon, probability = lhs.rpartition(":")
+    if not colon:
+        lhs, probability = probability, None
+    results = _scan_lhs(lhs, long_tokens)
+    if probability is not None:
+        results["probability"] = _scan_probability(probability)
+
+    results["rhs"] = _scan_tokens(rhs, long_tokens)
+    if not results["rhs"]:
+        raise ValueError(f"Rule '{rule}' has an empty rhs")
+    return results
+
+
+def _scan_probability(text: str) -> float:
+    """Parse the given rule probability, which must be a real number in (0, 1]."""
+    text = text.strip()
+    if not _PROBABILITY_RE.fullmatch(text):
+        raise ValueError(f"Failed to parse probability '{text}'")
+    probability = float(text)
+    if not 0 < probability <= 1:
+        raise ValueError(f"Probability {probability} is not in (0, 1]")
+    return probability
+
 
 class RuleParser:
     """Parse plaintext rules from e.g. unit tests, commandline args, JSON, to a Rule object.
@@ -46,70 +119,12 @@ class RuleParser:
         self.ignore: Set[TokenName] = set()
         self.long_tokens = long_tokens
 
-    @staticmethod
-    def __get_grammars(long_tokens: bool):
-        """Get the grammars for parsing rules and ignore lists.
-
-        :param long_tokens: Whether the tokens must be delimited to support long tokens.
-        """
-        ParserElement.enablePackrat()
-
-        COLON = Literal(":")
-        LESS_THAN = Literal("<")
-        GREATER_THAN = Literal(">")
-        ARROW = Literal("->")
-
-        PITCH_UP = Literal("^")
-        PITCH_DOWN = Literal("v")
-        ROLL_CCW = Literal("<")
-        ROLL_CW = Literal(">")
-        YAW_LEFT = Literal("-")
-        YAW_RIGHT = Literal("+")
-        PUSH_STACK = Literal("[")
-        POP_STACK = Literal("]")
-        FLIP_DIRECTION = Literal("|")
-
-        token = (
-            (Word(alphanums) if long_tokens else Word(alphanums, min=1, exact=1))
-            | PITCH_UP
-            | PITCH_DOWN
-            | ROLL_CCW
-            | ROLL_CW
-            | YAW_LEFT
-            | YAW_RIGHT
-            | PUSH_STACK
-            | POP_STACK
-            | FLIP_DIRECTION
-        )
-
-        probability = pyparsing_common.real
-        rule_lhs = (
-            Optional(token.setResultsName("left_context") + LESS_THAN)
-            + token.setResultsName("lhs")
-            + Optional(GREATER_THAN + token.setResultsName("right_context"))
-        )
-        rule_rhs = delimitedList(token, delim=White()) if long_tokens else OneOrMore(token)
-        rule = (
-            rule_lhs
-            + Optional(COLON + probability.setResultsName("probability"))
-            + ARROW
-            + rule_rhs.setResultsName("rhs")
-        )
-
-        tokens = delimitedList(token, delim=White()) if long_tokens else OneOrMore(token)
-        ignore = Literal("#ignore") + Optional(COLON) + tokens.setResultsName("ignore")
-
-        return rule, ignore
-
     def _parse(self, rule: str):
         """Parse the given rule into textual tokens."""
-        rule_grammar, ignore_grammar = self.__get_grammars(self.long_tokens)
         rule = rule.replace(",", " ")
         rule = rule.strip()
-        if rule.startswith("#"):
-            return ignore_grammar.parseString(rule)
         # NOTE: Expanding this to parametric grammars is nontrivial.
-        return rule_grammar.parseString(rule)
+        return _scan(rule, self.long_tokens)
 
     def parse(self, rule: str) -> Tuple[Token, RuleMapping]:
         """Parse the given rule into rhs -> production mappings.
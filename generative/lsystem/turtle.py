@@ -1,15 +1,24 @@
 import logging
+from math import cos, radians, sin, sqrt
+from typing import Tuple
 
 import numpy as np
 from scipy.spatial.transform import Rotation
 
 logger = logging.getLogger(__name__)
 
+# A unit quaternion (x, y, z, w), with the scalar last, like scipy.
+Quaternion = Tuple[float, float, float, float]
+
 
 class Turtle:
     """A turtle object that keeps track of its position and rotation in 3D space.
 
     All angles given in degrees.
+
+    The turtle is moved and rotated millions of times when interpreting an L-System string, so
+    internally its position is a tuple of floats, and its rotation a unit quaternion. Composing
+    quaternions with plain float math is much cheaper than going through numpy or scipy.
     """
 
     def __init__(self, position: np.ndarray = None, rotation: Rotation = None):
@@ -25,37 +34,104 @@ class Turtle:
         if rotation is not None and not isinstance(rotation, Rotation):
             raise TypeError("Rotation must be a scipy.spatial.transform.Rotation")
 
-        self._position = np.array(position) if position is not None else np.array([[0, 0, 0]])
+        self.position = position if position is not None else (0, 0, 0)
         self.rotation = rotation if rotation is not None else Rotation.from_matrix(np.eye(3))
 
     @property
-    def position(self):
+    def position(self) -> np.ndarray:
         """Ensure the position is externally always treated as (3,), not (1, 3)."""
-        return self._position.reshape((3,))
+        return np.array(self._position)
 
     @position.setter
     def position(self, value):
-        self._position = np.array(value)
+        self._position = tuple(np.asarray(value, dtype=float).reshape((3,)).tolist())
+
+    @property
+    def coordinates(self) -> Tuple[float, float, float]:
+        """Get the turtle's position as a tuple of floats."""
+        return self._position
+
+    @coordinates.setter
+    def coordinates(self, value: Tuple[float, float, float]):
+        self._position = value
+
+    @property
+    def rotation(self) -> Rotation:
+        """Get the turtle's rotation as a scipy Rotation."""
+        if self._rotation is None:
+            self._rotation = Rotation.from_quat(self._quaternion)
+        return self._rotation
+
+    @rotation.setter
+    def rotation(self, value: Rotation):
+        self._rotation = value
+        self._quaternion = tuple(value.as_quat().reshape((4,)).tolist())
+
+    @property
+    def quaternion(self) -> Quaternion:
+        """Get the turtle's rotation as an (x, y, z, w) unit quaternion."""
+        return self._quaternion
+
+    @quaternion.setter
+    def quaternion(self, value: Quaternion):
+        self._quaternion = value
+        self._rotation = None
 
     def forward(self, stepsize=1):
         """Move the turtle forward by the given stepsize."""
-        orientation = (0, 0, 1)
-        orientation = self.rotation.apply(orientation)
-        self.position = self.position + stepsize * orientation
-        logger.debug(f"stepping forward to {self.position}")
-
-    def yaw(self, angle):
-        """Yaw the turtle around its local Z axis."""
+        # Rotate the vector (0, 0, 1) by the turtle's rotation. This is the third column of the
+        # quaternion's rotation matrix.
+        x, y, z, w = self._quaternion
+        px, py, pz = self._position
+        self._position = (
+            px + stepsize * 2 * (x * z + w * y),
+            py + stepsize * 2 * (y * z - w * x),
+            pz + stepsize * (1 - 2 * (x * x + y * y)),
+        )
+        logger.debug("stepping forward to %s", self._position)
+
+    def rotate(self, rotation: Quaternion):
+        """Apply the given rotation relative to the turtle's local reference frame."""
+        x1, y1, z1, w1 = self._quaternion
+        x2, y2, z2, w2 = rotation
+        x = w1 * x2 + x1 * w2 + y1 * z2 - z1 * y2
+        y = w1 * y2 - x1 * z2 + y1 * w2 + z1 * x2
+        z = w1 * z2 + x1 * y2 - y1 * x2 + z1 * w2
+        w = w1 * w2 - x1 * x2 - y1 * y2 - z1 * z2
+        # Renormalize to avoid accumulating floating point error over many rotations.
+        norm = sqrt(x * x + y * y + z * z + w * w)
+        self.quaternion = (x / norm, y / norm, z / norm, w / norm)
+
+    @staticmethod
+    def yaw_rotation(angle) -> Quaternion:
+        """Get the rotation that yaws the turtle around its local Z axis."""
         # NOTE: Capital axes indicate intrinsic Euler angles.
         # Apparently, it's normal to indicate the normal and longitudinal axes with X and Z respectively
         # I still want to keep the mental model of "Z is up, duh."
-        self.rotation = self.rotation * Rotation.from_euler("X", [angle], degrees=True)
-        logger.debug(f"yaw {angle}deg")
+        half = radians(angle) / 2
+        return (sin(half), 0.0, 0.0, cos(half))
+
+    @staticmethod
+    def pitch_rotation(angle) -> Quaternion:
+        """Get the rotation that pitches the turtle around its local Y axis."""
+        half = radians(angle) / 2
+        return (0.0, sin(half), 0.0, cos(half))
+
+    @staticmethod
+    def roll_rotation(angle) -> Quaternion:
+        """Get the rotation that rolls the turtle around its local X axis."""
+        half = radians(angle) / 2
+        return (0.0, 0.0, sin(half), cos(half))
+
+    def yaw(self, angle):
+        """Yaw the turtle around its local Z axis."""
+        self.rotate(self.yaw_rotation(angle))
+        logger.debug("yaw %sdeg", angle)
 
     def pitch(self, angle):
         """Pitch the turtle around its local Y axis."""
-        self.rotation = self.rotation * Rotation.from_euler("Y", [angle], degrees=True)
-        logger.debug(f"pitch {angle}deg")
+        self.rotate(self.pitch_rotation(angle))
+        logger.debug("pitch %sdeg", angle)
 
     def roll(self, angle):
         """Roll the turtle around its local X axis.
@@ -63,5 +139,5 @@ class Turtle:
         Just a roll is enough to affect direction, since it's a rotation around the longitudinal
         axis. That is, a rotation around the axis you're facing.
         """
-        self.rotation = self.rotation * Rotation.from_euler("Z", [angle], degrees=True)
-        logger.debug(f"roll {angle}deg")
+        self.rotate(self.roll_rotation(angle))
+        logger.debug("roll %sdeg", angle)
@@ -1,11 +1,10 @@
 import logging
 from math import radians
-from typing import Iterable, Tuple
+from typing import Iterable, List, Sequence, Tuple
 
 import numpy as np
-from sklearn.decomposition import PCA, TruncatedSVD
 
-from generative.flatten import TaggedPointSequence
+from generative.flatten import Tag, TaggedPointSequence
 
 logger = logging.getLogger(name=__name__)
 
@@ -28,54 +27,65 @@ def project(
     elif kind == "auto":
         # PCA has tended to flip things upside down, to flip about the x axis by 180 and rotate a
         # a bit to ensure no symmetry
-        decomp = PCA(n_components=3)
-        points, tags = unzip(tagged_points)
-        points = scale * np.array(list(_zeropad_3d(points)))
-        transformed = decomp.fit_transform(points)
+        points, tags = _to_padded_array_and_tags(tagged_points)
+        points *= scale
+        transformed = _pca_project(points, 3)
         logger.error(transformed.shape)
-        rotation = _rot_x(radians(180)) @ _rot_z(radians(13))
-        transformed = transformed @ rotation
-        return zip(transformed[:, :dimensions], tags)
+        # Only compute the coordinates that are kept.
+        transformed = transformed @ _AUTO_ROTATION[:, :dimensions]
+        return zip(transformed, tags)
     elif kind == "I":
-        points, tags = unzip(tagged_points)
+        transformed_point_sequence = tagged_points
         if scale != 1.0:
-            points = (tuple(scale * c for c in point) for point in points)
-        transformed_point_sequence = zip(points, tags)
+            transformed_point_sequence = (
+                (tuple(scale * c for c in point), tag) for point, tag in tagged_points
+            )
     else:
         raise ValueError(f"Unsupported projection type '{kind=}'")
 
     return transformed_point_sequence
 
 
-def unzip(iterable):
-    return zip(*iterable)
-
-
 def _fit_transform(
     tagged_points: TaggedPointSequence, kind, dimensions, scale
 ) -> TaggedPointSequence:
     """Project the given geometries."""
-    points, tags = unzip(tagged_points)
-
-    # Convert the generator of points to an array of points.
     # This will consume the generator, and keep the points loaded in memory.
-    points = scale * np.array(list(_zeropad_3d(points)))
+    points, tags = _to_padded_array_and_tags(tagged_points)
+    points *= scale
 
     # TruncatedSVD picked a sideways view
     # PCA picked a top-down view
     if kind == "pca":
-        decomp = PCA(n_components=dimensions)
+        transformed = _pca_project(points, dimensions)
     elif kind == "svd":
         if dimensions >= 3:
             raise ValueError("SVD cannot be used for 3D -> 3D projections")
+        # sklearn takes a long time to import, so only import it when it's needed.
+        from sklearn.decomposition import TruncatedSVD  # pylint: disable=import-outside-toplevel
+
         decomp = TruncatedSVD(n_components=dimensions, n_iter=5)
+        transformed = decomp.fit_transform(points)
     else:
         raise ValueError(f"Unsupported projection '{kind}'")
-    transformed = decomp.fit_transform(points)
 
     return zip(transformed, tags)
 
 
+def _pca_project(points: np.ndarray, dimensions: int) -> np.ndarray:
+    """Project the given points onto their first principal components.
+
+    This is what sklearn's PCA does, but a single SVD of the centered points avoids its overhead.
+    """
+    centered = points - points.mean(axis=0)
+    u, s, _ = np.linalg.svd(centered, full_matrices=False)
+    u = u[:, :dimensions]
+    # Pick the same deterministic signs as sklearn, so that the largest magnitude value in each
+    # column of u is positive.
+    signs = np.sign(u[np.argmax(np.abs(u), axis=0), range(u.shape[1])])
+    return u * (s[:dimensions] * signs)
+
+
 def _rot_x(theta):
     """X axis rotation matrix."""
     return np.array(
@@ -109,13 +119,18 @@ def _rot_z(theta):
     )
 
 
+# The rotations are constant, so compute them once.
+_ISOMETRIC_ROTATION = _rot_x(radians(35.264)) @ _rot_y(radians(45))
+_AUTO_ROTATION = _rot_x(radians(180)) @ _rot_z(radians(13))
+
+
 def _isometric(tagged_points: TaggedPointSequence, dimensions, scale) -> TaggedPointSequence:
     """Perform an isometric projection with rotation matrices."""
     # TODO: This isometric projection hasn't given very good results so far. It needs more work.
-    rotation = _rot_x(radians(35.264)) @ _rot_y(radians(45))
-    points, tags = unzip(tagged_points)
-    for point, tag in zip(_zeropad_3d(points), tags):
-        yield (scale * np.array(point) @ rotation)[:dimensions], tag
+    points, tags = _to_padded_array_and_tags(tagged_points)
+    # Project every point with a single matrix multiplication.
+    transformed = points @ (scale * _ISOMETRIC_ROTATION[:, :dimensions])
+    yield from zip(map(tuple, transformed.tolist()), tags)
 
 
 def _zeropad_3d(points: Iterable[Tuple[float]]) -> Iterable[Tuple[float]]:
@@ -123,6 +138,37 @@ def _zeropad_3d(points: Iterable[Tuple[float]]) -> Iterable[Tuple[float]]:
     return ((*point, *padding)[:3] for point in points)
 
 
+def _to_padded_array(points: Sequence[Tuple[float]]) -> np.ndarray:
+    """Convert the given 2D or 3D points to an (N, 3) array, padding 2D points with zeros."""
+    try:
+        points = np.array(points, dtype=float)
+    except ValueError:
+        # A mix of 2D and 3D points can't be converted in one go.
+        return np.array(list(_zeropad_3d(points)), dtype=float)
+
+    if points.size == 0:
+        return np.zeros((0, 3))
+    # The L-System interpreter outputs 3D points, which don't need to be padded, or copied.
+    if points.shape[1] == 3:
+        return points
+    padded = np.zeros((len(points), 3))
+    padded[:, : points.shape[1]] = points
+    return padded
+
+
+def _to_padded_array_and_tags(tagged_points: TaggedPointSequence) -> Tuple[np.ndarray, List[Tag]]:
+    """Split the given tagged points into an (N, 3) array of points and a list of tags.
+
+    The tagged points are only iterated over once.
+    """
+    points = []
+    tags = []
+    for point, tag in tagged_points:
+        points.append(point)
+        tags.append(tag)
+    return _to_padded_array(points), tags
+
+
 def _drop_coord(tagged_points: TaggedPointSequence, basis: str, scale) -> TaggedPointSequence:
     """Project the given 3D geometry objects onto one of the standard 2D bases."""
     # Do not allow flips. That is, you cannot reorder coordinates, only drop.
@@ -134,8 +180,7 @@ def _drop_coord(tagged_points: TaggedPointSequence, basis: str, scale) -> Tagged
         coord = 0
     else:
         raise ValueError(f"Unsupported basis for dropping coordinates '{basis=}'")
-    points, tags = unzip(tagged_points)
-    for point, tag in zip(_zeropad_3d(points), tags):
-        point = (*point[:coord], *point[coord + 1 :])
-        point = tuple(scale * c for c in point)
-        yield point, tag
+    points, tags = _to_padded_array_and_tags(tagged_points)
+    keep = [c for c in range(3) if c != coord]
+    transformed = scale * points[:, keep]
+    yield from zip(map(tuple, transformed.tolist()), tags)
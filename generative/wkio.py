@@ -1,39 +1,102 @@
 import ast
 import io
 import logging
-from typing import Iterable
+import math
+import re
+from typing import Iterable, Union
 
+import numpy as np
+import shapely
 import shapely.geometry
+from more_itertools import chunked
 from shapely import wkb, wkt
 
-from generative.flatten import PointTag, TaggedPointSequence, flatten, unflatten
+from generative.flatten import PointTag, TaggedPoint, TaggedPointSequence, flatten, unflatten
 
 Geometry = shapely.geometry.base.BaseGeometry
 logger = logging.getLogger(name=__name__)
 
+# The number of lines to format before writing them to the output buffer.
+_WRITE_CHUNK_SIZE = 4096
+# The number of lines to parse at once, when supported by Shapely.
+_READ_CHUNK_SIZE = 4096
+# Shapely 2.0 can convert many geometries to and from WKT or WKB in a single call.
+_HAS_VECTORIZED_IO = hasattr(shapely, "to_wkt")
+# Looking up tags in a plain dict is cheaper than going through PointTag.__getitem__.
+_TAGS_BY_NAME = dict(PointTag.__members__)
+_TAGS_BY_VALUE = {tag.value: tag for tag in PointTag}
+
+
+def _parse_batched(buffer: io.TextIOWrapper, parse) -> Iterable[Geometry]:
+    """Parse the lines of the given buffer in batches with the given Shapely 2.0 function."""
+    for lines in chunked(buffer, _READ_CHUNK_SIZE):
+        lines = [line.strip() for line in lines]
+        for line, geometry in zip(lines, parse(lines, on_invalid="ignore")):
+            if geometry is None:
+                logger.error(f"Failed to parse {line=}")
+                continue
+            logger.debug("loaded %s", geometry)
+            yield geometry
+
 
 def _parse_wkt(buffer: io.TextIOWrapper) -> Iterable[Geometry]:
+    if _HAS_VECTORIZED_IO:
+        yield from _parse_batched(buffer, shapely.from_wkt)
+        return
+
     for line in buffer:
         line = line.strip()
         try:
             geometry = wkt.loads(line)
-            logger.debug(f"loaded {geometry}")
+            logger.debug("loaded %s", geometry)
             yield geometry
         except shapely.errors.WKTReadingError:
             logger.error(f"Failed to parse {line=}")
 
 
 def _parse_wkb(buffer: io.TextIOWrapper) -> Iterable[Geometry]:
+    if _HAS_VECTORIZED_IO:
+        yield from _parse_batched(buffer, shapely.from_wkb)
+        return
+
     for line in buffer:
         line = line.strip()
         try:
             geometry = wkb.loads(line, hex=True)
-            logger.debug(f"loaded {geometry}")
+            logger.debug("loaded %s", geometry)
             yield geometry
         except shapely.errors.WKBReadingError:
             logger.error(f"Failed to parse {line=}")
 
 
+def _parse_coordinate(coordinate: str) -> Union[int, float]:
+    """Parse a single coordinate the same way ast.literal_eval would.
+
+    Integers stay integers, and nan or inf are rejected, because they aren't Python literals.
+    """
+    try:
+        return int(coordinate)
+    except ValueError:
+        value = float(coordinate)
+        if not math.isfinite(value):
+            raise ValueError(f"Coordinate '{coordinate}' must be finite") from None
+        return value
+
+
+def _parse_point(point: str):
+    """Parse a point formatted like '(x, y, z)'.
+
+    Parsing the coordinates directly is an order of magnitude faster than ast.literal_eval, which is
+    only used as a fallback for anything more exotic.
+    """
+    if point[:1] == "(" and point[-1:] == ")":
+        try:
+            return tuple(map(_parse_coordinate, point[1:-1].split(",")))
+        except ValueError:
+            pass
+    return ast.literal_eval(point)
+
+
 def deserialize_flat(buffer: io.TextIOWrapper) -> TaggedPointSequence:
     r"""Deserialize a flattened sequence of points.
 
@@ -82,42 +145,124 @@ def deserialize_flat(buffer: io.TextIOWrapper) -> TaggedPointSequence:
     """
     for line in buffer:
         line = line.strip()
-        parts = line.split("\t")
-        tags = tuple()
-        if not parts:
-            # Blank line
-            continue
-
-        # Fuck this.
-        point = parts[0]
-        try:
-            # Parse the tuple of floats.
-            point = ast.literal_eval(point)
-        except BaseException as e:
-            logger.warning("Could not interpret '%s' as a tuple. Ignoring...", point, exc_info=e)
-            continue
-
-        if not isinstance(point, tuple):
-            logger.warning("Did not interpret '%s' as a tuple. Ignoring...", point)
-            continue
-        if not all(isinstance(c, (int, float)) for c in point):
-            logger.warning("Point '%s' must be numeric. Ignoring...", point)
-            continue
-        if len(point) not in (2, 3):
-            logger.warning("Point '%s' must be 2D or 3D. Ignoring...", point)
+        if not line:
             continue
 
-        if len(parts) > 1:
-            tags = parts[1:]
-            tags = " ".join(tags)
-            tags = tags.split()
+        # Most lines are well-formed, so try to parse them with a single regex first.
+        match = _FLAT_LINE_RE.fullmatch(line)
+        if match is not None:
+            x, y, z, tags = match.groups()
             try:
-                # Convert the Enum name to the enumeration.
-                tags = tuple(PointTag[tag] for tag in tags)
-            except BaseException as e:
-                logger.warning("Failed to parse tags '%s'. Ignoring...", tags)
+                point = (_parse_coordinate(x), _parse_coordinate(y))
+                if z is not None:
+                    point += (_parse_coordinate(z),)
+                tags = tuple(_TAGS_BY_NAME[tag] for tag in tags.split()) if tags else ()
+            except (ValueError, KeyError):
+                pass
+            else:
+                yield point, tags
                 continue
-        yield point, tags
+
+        # Otherwise fall back on the slower parsing that explains what's wrong with the line.
+        tagged_point = _parse_flat_line(line)
+        if tagged_point is not None:
+            yield tagged_point
+
+
+# A '(x, y[, z])' point, optionally followed by a tab and its tags.
+_FLAT_LINE_RE = re.compile(r"\(([^,()]+),([^,()]+)(?:,([^,()]+))?\)(?:\t(.*))?")
+
+
+def _parse_flat_line(line: str) -> Union[None, TaggedPoint]:
+    """Parse the given line of flattened points, or log why it can't be parsed."""
+    # Everything after the first tab is whitespace separated tags.
+    point, _, tags = line.partition("\t")
+
+    # Fuck this.
+    try:
+        # Parse the tuple of floats.
+        point = _parse_point(point)
+    except BaseException as e:
+        logger.warning("Could not interpret '%s' as a tuple. Ignoring...", point, exc_info=e)
+        return None
+
+    if not isinstance(point, tuple):
+        logger.warning("Did not interpret '%s' as a tuple. Ignoring...", point)
+        return None
+    if not all(isinstance(c, (int, float)) for c in point):
+        logger.warning("Point '%s' must be numeric. Ignoring...", point)
+        return None
+    if len(point) not in (2, 3):
+        logger.warning("Point '%s' must be 2D or 3D. Ignoring...", point)
+        return None
+
+    tags = tags.split()
+    try:
+        # Convert the Enum name to the enumeration.
+        tags = tuple(_TAGS_BY_NAME[tag] for tag in tags)
+    except BaseException as e:
+        logger.warning("Failed to parse tags '%s'. Ignoring...", tags)
+        return None
+    return point, tags
+
+
+def serialize_flat_bin(tagged_points: TaggedPointSequence, buffer: io.TextIOWrapper):
+    """Serialize the given flattened geometries in a binary format.
+
+    The tagged points are written as four NumPy arrays with np.save():
+        1. The (N, 3) points, with 2D points padded with zeros.
+        2. The dimension (2 or 3) of each point.
+        3. The number of tags each point has.
+        4. All of the tags, concatenated.
+
+    This is much faster to write and read than the text format, at the cost of readability, and
+    of streaming. If given a text buffer, the arrays are written to its underlying binary buffer.
+    """
+    points = []
+    dimensions = []
+    tag_counts = []
+    tags = []
+    for point, point_tags in tagged_points:
+        points.append((*point, 0.0)[:3])
+        dimensions.append(len(point))
+        tag_counts.append(len(point_tags))
+        tags.extend(point_tags)
+
+    buffer = _binary_buffer(buffer)
+    np.save(buffer, np.array(points, dtype=float).reshape((-1, 3)), allow_pickle=False)
+    np.save(buffer, np.array(dimensions, dtype=np.uint8), allow_pickle=False)
+    np.save(buffer, np.array(tag_counts, dtype=np.uint32), allow_pickle=False)
+    np.save(buffer, np.array(tags, dtype=np.uint8), allow_pickle=False)
+    buffer.flush()
+
+
+def deserialize_flat_bin(buffer: io.TextIOWrapper) -> TaggedPointSequence:
+    """Deserialize the binary flattened geometries written by serialize_flat_bin().
+
+    np.load() needs to seek, which pipes don't support, so the whole input is read into memory
+    first. The format isn't streamed anyway.
+    """
+    buffer = io.BytesIO(_binary_buffer(buffer).read())
+    points, dimensions, tag_counts, tags = (np.load(buffer, allow_pickle=False) for _ in range(4))
+
+    tags = [_TAGS_BY_VALUE[tag] for tag in tags.tolist()]
+    start = 0
+    for point, dimension, count in zip(points.tolist(), dimensions.tolist(), tag_counts.tolist()):
+        yield tuple(point[:dimension]), tuple(tags[start : start + count])
+        start += count
+
+
+def _binary_buffer(buffer):
+    """Get the binary buffer underlying the given text buffer, if it is one."""
+    if isinstance(buffer, io.TextIOBase):
+        # Text buffers like io.StringIO aren't backed by a binary buffer.
+        binary = getattr(buffer, "buffer", None)
+        if binary is None:
+            raise TypeError(f"The flat-bin format requires a binary stream, not {type(buffer)}")
+        if buffer.writable():
+            buffer.flush()
+        return binary
+    return buffer
 
 
 def deserialize_geometries(buffer: io.TextIOWrapper, fmt="wkt") -> Iterable[Geometry]:
@@ -129,18 +274,30 @@ def deserialize_geometries(buffer: io.TextIOWrapper, fmt="wkt") -> Iterable[Geom
     # not a sequence of geometries. But this deserialization method is provided regardless.
     if fmt == "flat":
         return unflatten(deserialize_flat(buffer))
+    if fmt == "flat-bin":
+        return unflatten(deserialize_flat_bin(buffer))
     raise ValueError(f"{fmt=} unsupported")
 
 
 def _serialize_wkt(geometries: Iterable[Geometry], buffer: io.TextIOWrapper):
-    # TODO: Determine how much to chunk before writing.
+    if _HAS_VECTORIZED_IO:
+        for batch in chunked(geometries, _WRITE_CHUNK_SIZE):
+            # Match wkt.dump(), which doesn't round.
+            lines = shapely.to_wkt(batch, trim=True, rounding_precision=-1)
+            buffer.write("\n".join(lines) + "\n")
+        return
+
     for geometry in geometries:
         wkt.dump(geometry, buffer, trim=True)
         buffer.write("\n")
 
 
 def _serialize_wkb(geometries: Iterable[Geometry], buffer: io.TextIOWrapper):
-    # TODO: Determine how much to chunk before writing.
+    if _HAS_VECTORIZED_IO:
+        for batch in chunked(geometries, _WRITE_CHUNK_SIZE):
+            buffer.write("\n".join(shapely.to_wkb(batch, hex=True)) + "\n")
+        return
+
     for geometry in geometries:
         wkb.dump(geometry, buffer, hex=True)
         buffer.write("\n")
@@ -199,11 +356,20 @@ def serialize_flat(tagged_points: TaggedPointSequence, buffer: io.TextIOWrapper)
         >>> new_tagged_points = list(deserialize_flat(buffer))
         >>> assert new_tagged_points == tagged_points
     """
+    # Writing each line separately is slow, so format the lines in chunks, and write each chunk
+    # at once.
+    lines = []
+    # There are only a handful of distinct combinations of tags, so format each one once.
+    tag_suffixes = {(): "\n"}
     for point, tags in tagged_points:
-        buffer.write(str(point))
-        if tags:
-            buffer.write("\t" + " ".join(tag.name for tag in tags))
-        buffer.write("\n")
+        suffix = tag_suffixes.get(tags)
+        if suffix is None:
+            suffix = tag_suffixes[tags] = "\t" + " ".join(tag.name for tag in tags) + "\n"
+        lines.append(f"{point}{suffix}")
+        if len(lines) >= _WRITE_CHUNK_SIZE:
+            buffer.write("".join(lines))
+            lines.clear()
+    buffer.write("".join(lines))
 
 
 def serialize_geometries(geometries: Iterable[Geometry], buffer: io.TextIOWrapper, fmt="wkt"):
@@ -213,5 +379,7 @@ def serialize_geometries(geometries: Iterable[Geometry], buffer: io.TextIOWrappe
         _serialize_wkb(geometries, buffer)
     elif fmt == "flat":
         serialize_flat(flatten(geometries), buffer)
+    elif fmt == "flat-bin":
+        serialize_flat_bin(flatten(geometries), buffer)
     else:
         raise ValueError(f"{fmt=} unsupported")
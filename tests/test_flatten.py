@@ -2,6 +2,7 @@ import unittest
 
 from shapely.geometry import (
     GeometryCollection,
+    LinearRing,
     LineString,
     MultiLineString,
     MultiPoint,
@@ -10,50 +11,16 @@ from shapely.geometry import (
     Polygon,
 )
 
-from generative.flatten import PointTag, flatten, flatten_single, unflatten, wrap_tagged
+from generative.flatten import (
+    PointTag,
+    flatten,
+    flatten_linestrings,
+    flatten_single,
+    unflatten,
+)
 
 
 class TestToTaggedPoints(unittest.TestCase):
-    def testwrap_tagged(self):
-        sequence = [
-            ("p", ()),
-            ("p", ()),
-        ]
-        expected = [("p", (PointTag.POLYGON_BEGIN,)), ("p", (PointTag.POLYGON_END,))]
-        wrapped = list(wrap_tagged(iter(sequence), PointTag.POLYGON_BEGIN))
-        for actual, desired in zip(wrapped, expected):
-            self.assertTupleEqual(actual, desired)
-
-        sequence = [
-            ("p", ()),
-            ("p", ()),
-            ("p", ()),
-        ]
-        expected = [
-            ("p", (PointTag.POLYGON_BEGIN,)),
-            ("p", ()),
-            ("p", (PointTag.POLYGON_END,)),
-        ]
-
-        wrapped = list(wrap_tagged(iter(sequence), PointTag.POLYGON_BEGIN))
-        for actual, desired in zip(wrapped, expected):
-            self.assertTupleEqual(actual, desired)
-
-        sequence = [
-            ("p", (PointTag.LINESTRING_BEGIN,)),
-            ("p", ()),
-            ("p", (PointTag.LINESTRING_END,)),
-        ]
-        expected = [
-            ("p", (PointTag.POLYGON_BEGIN, PointTag.LINESTRING_BEGIN)),
-            ("p", ()),
-            ("p", (PointTag.LINESTRING_END, PointTag.POLYGON_END)),
-        ]
-
-        wrapped = list(wrap_tagged(iter(sequence), PointTag.POLYGON_BEGIN))
-        for actual, desired in zip(wrapped, expected):
-            self.assertTupleEqual(actual, desired)
-
     def test_point(self):
         p = Point(0, 1)
         tagged = list(flatten_single(p))
@@ -96,6 +63,19 @@ class TestToTaggedPoints(unittest.TestCase):
         for actual, desired in zip(tagged, expected):
             self.assertTupleEqual(actual, desired)
 
+    def test_linearring(self):
+        r = LinearRing([(0, 1), (2, 3), (4, 5)])
+        tagged = list(flatten_single(r))
+        expected = [
+            (r.coords[0], (PointTag.LINESTRING_BEGIN,)),
+            (r.coords[1], ()),
+            (r.coords[2], ()),
+            (r.coords[3], (PointTag.LINESTRING_END,)),
+        ]
+        self.assertEqual(len(tagged), 4)
+        for actual, desired in zip(tagged, expected):
+            self.assertTupleEqual(actual, desired)
+
     def test_linestrings(self):
         ls = [
             LineString([(0, 1), (2, 3), (4, 5)]),
@@ -112,6 +92,8 @@ class TestToTaggedPoints(unittest.TestCase):
         for actual, desired in zip(tagged, expected):
             self.assertTupleEqual(actual, desired)
 
+        self.assertListEqual(list(flatten_linestrings(ls)), tagged)
+
     def test_multilinestring(self):
         ls = [
             LineString([(0, 1), (2, 3), (4, 5)]),
@@ -329,6 +311,22 @@ class TestFromTaggedPoints(unittest.TestCase):
         for actual, desired in zip(new_geometries, geometries):
             self.assertEqual(actual, desired)
 
+    def test_linestrings_points_order(self):
+        geometries = [
+            LineString([(0, 1), (2, 3)]),
+            LineString([(4, 5, 6), (7, 8, 9)]),
+            Point(0, 1),
+            LineString([(6, 7), (8, 9), (10, 11)]),
+            MultiLineString([[(0, 1), (2, 3)]]),
+            LineString([(12, 13), (14, 15)]),
+        ]
+        tagged = list(flatten(geometries))
+        new_geometries = list(unflatten(tagged))
+
+        self.assertEqual(len(new_geometries), len(geometries))
+        for actual, desired in zip(new_geometries, geometries):
+            self.assertEqual(actual, desired)
+
     def test_polygon_no_holes(self):
         p = Polygon(shell=[(0, 1), (2, 3), (4, 5)])
         tagged = list(flatten([p]))
@@ -373,6 +371,20 @@ class TestFromTaggedPoints(unittest.TestCase):
         for actual, desired in zip(new_geometries, geometries):
             self.assertEqual(actual, desired)
 
+    def test_single_multipoint(self):
+        geometries = [MultiPoint([(0, 1)]), Point(2, 3)]
+        tagged = list(flatten(geometries))
+        expected = [
+            ((0, 1), (PointTag.MULTIPOINT_BEGIN, PointTag.MULTIPOINT_END)),
+            ((2, 3), ()),
+        ]
+        self.assertListEqual(tagged, expected)
+
+        new_geometries = list(unflatten(tagged))
+        self.assertEqual(len(new_geometries), 2)
+        for actual, desired in zip(new_geometries, geometries):
+            self.assertEqual(actual, desired)
+
     def test_multilinestring(self):
         geometries = [
             LineString([(0, 0), (1, 1)]),
@@ -471,3 +483,18 @@ class TestFromTaggedPoints(unittest.TestCase):
         self.assertEqual(len(new_geometries), 3)
         for actual, desired in zip(new_geometries, geometries):
             self.assertEqual(actual, desired)
+
+    def test_mismatched_tags(self):
+        tagged = [
+            ((0, 0), (PointTag.LINESTRING_BEGIN,)),
+            ((1, 1), (PointTag.HOLE_END,)),
+        ]
+        with self.assertRaisesRegex(ValueError, "HOLE_END .* after LINESTRING_BEGIN"):
+            list(unflatten(tagged))
+
+        tagged = [
+            ((0, 0), (PointTag.LINESTRING_BEGIN,)),
+            ((1, 1), (PointTag.LINESTRING_END, PointTag.POLYGON_END)),
+        ]
+        with self.assertRaisesRegex(ValueError, "POLYGON_END .* after None"):
+            list(unflatten(tagged))
@@ -1,10 +1,12 @@
+import copy
 import itertools
 import logging
+import pickle
 import unittest
 
 from multidict import MultiDict
 
-from generative.lsystem.grammar import LSystemGrammar, RuleMapping, Token, triplewise
+from generative.lsystem.grammar import LSystemGrammar, RuleMapping, Token
 
 logger = logging.getLogger(__name__)
 
@@ -60,6 +62,14 @@ class ContextFreeParsing(unittest.TestCase):
         actual = list(self.system.loop(axiom, 4))
         self.assertSequenceEqual(actual, expected)
 
+    def test_loop_matches_rewrite(self):
+        axiom = tokenize("ba")
+        expected = axiom
+        for n in range(7):
+            actual = self.system.loop(axiom, n)
+            self.assertSequenceEqual(actual, expected)
+            expected = list(self.system.rewrite(expected))
+
 
 class StochasticParsing(unittest.TestCase):
     """Test LSystemGrammar with stochastic parsing."""
@@ -74,7 +84,7 @@ class StochasticParsing(unittest.TestCase):
         )
 
     def test_pick_rule_a(self):
-        system = LSystemGrammar(self.rules, seed=0x420)
+        system = LSystemGrammar(self.rules, seed=0x425)
         rule = system.pick_rule(self.rules.getall("a"), None, None, None)
         rewrite = rule.production
         self.assertSequenceEqual(rewrite, tokenize("aa"))
@@ -235,6 +245,18 @@ class ContextSensitiveParsing(unittest.TestCase):
         rewrite = list(system.rewrite(rewrite))
         self.assertSequenceEqual(rewrite, tokenize("f1f0f0f1"))
 
+    def test_context_ignore_many(self):
+        rules = MultiDict(
+            {
+                "a": RuleMapping(tokenize("b"), right_context=Token("c")),
+                "c": RuleMapping(tokenize("d"), left_context=Token("a")),
+            }
+        )
+        system = LSystemGrammar(rules, ignore={"f"})
+        axiom = tokenize("affffcaff")
+        rewrite = list(system.rewrite(axiom))
+        self.assertSequenceEqual(rewrite, tokenize("bffffdaff"))
+
 
 class ParametricParsing(unittest.TestCase):
     """Test LSystemGrammar with parametric parsing."""
@@ -242,3 +264,20 @@ class ParametricParsing(unittest.TestCase):
 
 class CombinedParsing(unittest.TestCase):
     """Test LSystemGrammar with combined context sensitive, stochastic, and parametric parsing."""
+
+
+class TokenTests(unittest.TestCase):
+    def test_pickle(self):
+        token = Token("a")
+        self.assertEqual(pickle.loads(pickle.dumps(token)), token)
+        self.assertEqual(pickle.loads(pickle.dumps(Token(""))), Token(""))
+
+    def test_copy(self):
+        token = Token("a")
+        self.assertEqual(copy.copy(token), token)
+        self.assertEqual(copy.deepcopy(token), token)
+
+    def test_rule_mapping(self):
+        mapping = RuleMapping(tuple(tokenize("ab")), probability=0.5, left_context=Token("c"))
+        self.assertEqual(pickle.loads(pickle.dumps(mapping)), mapping)
+        self.assertEqual(copy.deepcopy(mapping), mapping)
@@ -4,6 +4,7 @@ import unittest
 from shapely.geometry import LineString
 
 from generative.lsystem.interpreter import LSystemInterpeter
+from generative.lsystem.turtle import Turtle
 
 
 # Debugging failing tests is impossible when all you get is
@@ -26,6 +27,43 @@ class InterpreterTests(unittest.TestCase):
         lines = list(self.i.interpret(tokens))
         self.assertListEqual(lines, expected)
 
+    def test_change_stepsize(self):
+        self.i.stepsize = 2.0
+        commands = io.StringIO("F")
+        expected = [LineString([(0, 0, 0), (0, 0, 2)])]
+        lines = list(self.i.interpret(self.i.tokenize(commands)))
+        self.assertListEqual(lines, expected)
+
+    def test_batches_stream(self):
+        interpreter = LSystemInterpeter("default", 1.0, 90, batch_size=1)
+        consumed = []
+
+        def tokens():
+            for token in "FfFfF":
+                consumed.append(token)
+                yield token
+
+        lines = interpreter.interpret(tokens())
+        self.assertEqual(next(lines), LineString([(0, 0, 0), (0, 0, 1)]))
+        # The first line is yielded without interpreting the rest of the tokens.
+        self.assertEqual("".join(consumed), "Ff")
+
+    def test_change_angle(self):
+        self.i.angle = 180
+        commands = io.StringIO("F+F")
+        expected = [LineString([(0, 0, 0), (0, 0, 1), (0, 0, 0)])]
+        lines = list(self.i.interpret(self.i.tokenize(commands)))
+        self.assertEqual(len(lines), len(expected))
+        for actual, desired in zip(lines, expected):
+            self.assertTrue(actual.equals_exact(desired, 1e-9))
+
+    def test_replace_turtle(self):
+        self.i.turtle = Turtle(position=(1, 0, 0))
+        commands = io.StringIO("F")
+        expected = [LineString([(1, 0, 0), (1, 0, 1)])]
+        lines = list(self.i.interpret(self.i.tokenize(commands)))
+        self.assertListEqual(lines, expected)
+
     def test_forward_no_draw(self):
         commands = io.StringIO("fGF")
         expected = [LineString([(0, 0, 1), (0, 0, 3)])]
@@ -119,3 +157,11 @@ class InterpreterTests(unittest.TestCase):
         tokens = self.i.tokenize(commands)
         lines = list(self.i.interpret(tokens))
         self.assertEqual(len(lines), 0)
+
+    def test_long_line(self):
+        # Longer than the initial active line buffer.
+        commands = io.StringIO("F+" * 100)
+        tokens = self.i.tokenize(commands)
+        lines = list(self.i.interpret(tokens))
+        self.assertEqual(len(lines), 1)
+        self.assertEqual(len(lines[0].coords), 101)
@@ -168,6 +168,36 @@ class RuleParsingParser(unittest.TestCase):
 
         self.assertSequenceEqual(result["rhs"], rule.split()[-1].replace(",", ""))
 
+    def test_undelimited_long_tokens(self):
+        parser = RuleParser(True)
+        result = parser._parse("left < tok>right:0.2->prod,uct")
+        self.assertEqual(result["left_context"], "left")
+        self.assertEqual(result["lhs"], "tok")
+        self.assertEqual(result["right_context"], "right")
+        self.assertEqual(result["probability"], 0.2)
+        self.assertSequenceEqual(result["rhs"], ["prod", "uct"])
+
+    def test_probabilities(self):
+        for rule, probability in [("a: 1.0 -> b", 1.0), ("a: .25 -> b", 0.25), ("a:1. -> b", 1.0)]:
+            self.assertEqual(RuleParser()._parse(rule)["probability"], probability, msg=rule)
+
+        for rule in ["a: 1 -> b", "a: 0.0 -> b", "a: 1.5 -> b", "a: nan -> b", "a: inf -> b"]:
+            with self.assertRaises(ValueError, msg=rule):
+                RuleParser().parse(rule)
+
+    def test_invalid_rules(self):
+        rules = [
+            ("#ignore:", False),
+            ("#ignore", True),
+            ("a -> b$c", False),
+            ("a$ -> b", False),
+            ("a -> bb$", True),
+            ("a$ -> bb", True),
+        ]
+        for rule, long_tokens in rules:
+            with self.assertRaises(ValueError, msg=rule):
+                RuleParser(long_tokens).parse(rule)
+
 
 def tokenize(s: str):
     return tuple(Token(c) for c in s)
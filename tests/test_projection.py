@@ -0,0 +1,55 @@
+import unittest
+
+import numpy as np
+from numpy.testing import assert_allclose
+from sklearn.decomposition import PCA
+
+from generative.projection import _pca_project, _to_padded_array, project
+
+
+class ProjectionTests(unittest.TestCase):
+    def test_padded_array(self):
+        assert_allclose(_to_padded_array([(1, 2), (3, 4)]), [(1, 2, 0), (3, 4, 0)])
+        assert_allclose(_to_padded_array([(1, 2, 3), (4, 5, 6)]), [(1, 2, 3), (4, 5, 6)])
+        # Mixed dimensionality
+        assert_allclose(_to_padded_array([(1, 2), (3, 4, 5)]), [(1, 2, 0), (3, 4, 5)])
+
+    def test_drop_coord(self):
+        tagged_points = [((1, 2, 3), ()), ((4, 5), ())]
+        result = list(project(tagged_points, kind="xz", scale=2))
+        self.assertEqual(result, [((2, 6), ()), ((8, 0), ())])
+
+    def test_identity(self):
+        tagged_points = [((1, 2, 3), ()), ((4, 5, 6), ())]
+        result = list(project(tagged_points, kind="I"))
+        self.assertEqual(result, tagged_points)
+
+    def test_isometric(self):
+        tagged_points = [((0, 0, 0), ()), ((1, 0, 0), ())]
+        result = list(project(tagged_points, kind="isometric", dimensions=3, scale=2))
+        self.assertEqual(len(result), 2)
+        assert_allclose(result[0][0], (0, 0, 0))
+        # Rotations preserve length.
+        assert_allclose(sum(c**2 for c in result[1][0]), 4)
+        # The coordinates are plain floats, so they serialize the same as any other point.
+        self.assertTrue(all(type(c) is float for point, _ in result for c in point))
+
+    def test_pca(self):
+        # Points along a line in 3D should project onto a single axis.
+        tagged_points = [((i, i, i), ()) for i in range(5)]
+        result = list(project(tagged_points, kind="pca", dimensions=2))
+        self.assertEqual(len(result), 5)
+        for point, _ in result:
+            self.assertEqual(len(point), 2)
+            self.assertAlmostEqual(point[1], 0)
+
+    def test_pca_matches_sklearn(self):
+        rng = np.random.default_rng(42)
+        points = rng.normal(size=(100, 3)) * (5, 2, 1)
+        for dimensions in (2, 3):
+            expected = PCA(n_components=dimensions).fit_transform(points)
+            actual = _pca_project(points, dimensions)
+            # sklearn changed its sign convention in 1.5, so only compare the components up to
+            # their sign.
+            signs = np.sign(np.sum(actual * expected, axis=0))
+            assert_allclose(actual * signs, expected, atol=1e-10)
@@ -81,3 +81,32 @@ class TurtleTests(unittest.TestCase):
         turtle.pitch(45)
         turtle.forward()
         assert_allclose(turtle.position, (1 + np.sqrt(2) / 2, 0, np.sqrt(2) / 2))
+
+    def test_rotate(self):
+        rotated = Turtle()
+        rotated.rotate(Turtle.yaw_rotation(45))
+        rotated.rotate(Turtle.pitch_rotation(30))
+        rotated.rotate(Turtle.roll_rotation(15))
+        rotated.forward()
+
+        turtle = Turtle()
+        turtle.yaw(45)
+        turtle.pitch(30)
+        turtle.roll(15)
+        turtle.forward()
+        assert_allclose(rotated.position, turtle.position)
+
+    def test_matches_scipy(self):
+        turtle = Turtle()
+        rotation = Rotation.identity()
+        for axis, angle in [("X", 30), ("Y", -45), ("Z", 60), ("X", 90), ("Y", 13)] * 100:
+            rotation = rotation * Rotation.from_euler(axis, angle, degrees=True)
+            if axis == "X":
+                turtle.yaw(angle)
+            elif axis == "Y":
+                turtle.pitch(angle)
+            else:
+                turtle.roll(angle)
+        assert_allclose(turtle.rotation.as_matrix(), rotation.as_matrix(), atol=1e-12)
+        turtle.forward(2)
+        assert_allclose(turtle.position, rotation.apply((0, 0, 2)), atol=1e-12)
@@ -1,4 +1,5 @@
 import io
+import os
 
 import pytest
 from shapely.geometry import (
@@ -11,8 +12,15 @@ from shapely.geometry import (
     Polygon,
 )
 
-from generative.flatten import flatten
-from generative.wkio import deserialize_flat, deserialize_geometries, serialize_flat
+from generative.flatten import PointTag, flatten
+from generative.wkio import (
+    deserialize_flat,
+    deserialize_flat_bin,
+    deserialize_geometries,
+    serialize_flat,
+    serialize_flat_bin,
+    serialize_geometries,
+)
 
 test_geometries = [
     Point(0, 0),
@@ -246,3 +254,86 @@ def test_deserialize_flat_invalid_separator():
     buffer = io.StringIO("(1, 2) LINESTRING_BEGIN\n")
     tagged_points = list(deserialize_flat(buffer))
     assert tagged_points == []
+
+
+def test_deserialize_flat_exponent():
+    buffer = io.StringIO("(1e-05, -2.5E+3)\tLINESTRING_BEGIN\n(0, 1, 2)\tLINESTRING_END\n")
+    tagged_points = list(deserialize_flat(buffer))
+    assert tagged_points == [
+        ((1e-05, -2500.0), (PointTag.LINESTRING_BEGIN,)),
+        ((0.0, 1.0, 2.0), (PointTag.LINESTRING_END,)),
+    ]
+
+
+def test_deserialize_flat_int_coordinates():
+    buffer = io.StringIO("(1, 2)\n(1.0, 2)\n")
+    tagged_points = list(deserialize_flat(buffer))
+    assert tagged_points == [((1, 2), ()), ((1.0, 2), ())]
+    assert [tuple(map(type, point)) for point, _ in tagged_points] == [(int, int), (float, int)]
+
+    buffer = io.StringIO()
+    serialize_flat(tagged_points, buffer)
+    assert buffer.getvalue() == "(1, 2)\n(1.0, 2)\n"
+
+
+def test_deserialize_flat_non_finite():
+    buffer = io.StringIO("(nan, 1)\n(1, inf)\n(-inf, 0, 0)\n")
+    tagged_points = list(deserialize_flat(buffer))
+    assert tagged_points == []
+
+
+@pytest.mark.parametrize("geometry", test_geometries)
+def test_flat_bin_serialize_deserialize(geometry):
+    buffer = io.BytesIO()
+    serialize_geometries([geometry], buffer, fmt="flat-bin")
+    buffer.seek(0)
+    assert geometry == next(deserialize_geometries(buffer, fmt="flat-bin"))
+
+
+def test_flat_bin_tagged_points():
+    geoms = [Point(0, 1), Point(2, 3, 4), Polygon(shell=[(0, 1), (2, 3), (4, 5)])]
+    expected_tagged_points = list(flatten(geoms))
+
+    buffer = io.BytesIO()
+    serialize_flat_bin(expected_tagged_points, buffer)
+    buffer.seek(0)
+
+    actual_tagged_points = list(deserialize_flat_bin(buffer))
+    assert actual_tagged_points == expected_tagged_points
+
+
+def test_flat_bin_unseekable():
+    geoms = [Point(0, 1), LineString([(0, 0, 0), (1, 1, 1)])]
+    expected_tagged_points = list(flatten(geoms))
+
+    data = io.BytesIO()
+    serialize_flat_bin(expected_tagged_points, data)
+
+    # Read from a pipe, like the tools do from stdin.
+    read_fd, write_fd = os.pipe()
+    with open(write_fd, "wb") as writer:
+        writer.write(data.getvalue())
+    with open(read_fd, "rb") as reader:
+        assert not reader.seekable()
+        actual_tagged_points = list(deserialize_flat_bin(reader))
+    assert actual_tagged_points == expected_tagged_points
+
+
+def test_flat_bin_many_tags():
+    begin = (PointTag.COLLECTION_BEGIN,) * 300
+    end = (PointTag.COLLECTION_END,) * 300
+    expected_tagged_points = [((0.0, 1.0), begin), ((2.0, 3.0), end)]
+
+    buffer = io.BytesIO()
+    serialize_flat_bin(expected_tagged_points, buffer)
+    buffer.seek(0)
+
+    actual_tagged_points = list(deserialize_flat_bin(buffer))
+    assert actual_tagged_points == expected_tagged_points
+
+
+def test_flat_bin_text_stream():
+    with pytest.raises(TypeError):
+        serialize_geometries([Point(0, 1)], io.StringIO(), fmt="flat-bin")
+    with pytest.raises(TypeError):
+        next(deserialize_geometries(io.StringIO(), fmt="flat-bin"))
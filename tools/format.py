@@ -61,7 +61,7 @@ def parse_args():
         "-I",
         type=str,
         default="wkt",
-        choices=["wkt", "wkb", "flat"],
+        choices=["wkt", "wkb", "flat", "flat-bin"],
         help="The input geometry format.",
     )
     parser.add_argument(
@@ -69,7 +69,7 @@ def parse_args():
         "-O",
         type=str,
         default="wkt",
-        choices=["wkt", "wkb", "flat"],
+        choices=["wkt", "wkb", "flat", "flat-bin"],
         help="The output geometry format.",
     )
 
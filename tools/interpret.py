@@ -19,10 +19,13 @@ import logging
 import pathlib
 import sys
 
+from more_itertools import chunked
+
 root = pathlib.Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(root))
+from generative.flatten import flatten_linestrings
 from generative.lsystem.interpreter import LSystemInterpeter
-from generative.wkio import serialize_geometries
+from generative.wkio import serialize_flat, serialize_geometries
 
 LOG_LEVELS = {
     "CRITICAL": logging.CRITICAL,
@@ -78,6 +81,13 @@ def parse_args():
         default=45.0,
         help="The angle in degrees used for the turtle's orientation modifications. Defaults to 45.",
     )
+    parser.add_argument(
+        "--batch-size",
+        "-b",
+        type=int,
+        default=1024,
+        help="The number of lines to construct at once. Lines are written and flushed in batches of this size, so use a smaller batch size to see results sooner. Defaults to 1024.",
+    )
     parser.add_argument(
         "--output-format",
         "-O",
@@ -99,10 +109,18 @@ def parse_args():
 
 
 def main(args):
-    interpreter = LSystemInterpeter(args.commandset, args.stepsize, args.angle)
+    interpreter = LSystemInterpeter(args.commandset, args.stepsize, args.angle, args.batch_size)
     tokens = interpreter.tokenize(args.input)
     geometries = interpreter.interpret(tokens)
-    serialize_geometries(geometries, args.output, args.output_format)
+    # Write and flush each batch as soon as it's interpreted, so that the output can be viewed as
+    # it's produced.
+    for batch in chunked(geometries, args.batch_size):
+        if args.output_format == "flat":
+            # The turtle only draws LineStrings.
+            serialize_flat(flatten_linestrings(batch), args.output)
+        else:
+            serialize_geometries(batch, args.output, args.output_format)
+        args.output.flush()
 
 
 if __name__ == "__main__":
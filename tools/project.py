@@ -11,8 +11,10 @@ from generative.flatten import flatten, unflatten
 from generative.projection import project
 from generative.wkio import (
     deserialize_flat,
+    deserialize_flat_bin,
     deserialize_geometries,
     serialize_flat,
+    serialize_flat_bin,
     serialize_geometries,
 )
 
@@ -49,14 +51,14 @@ def parse_args():
         "--input-format",
         "-I",
         default="wkt",
-        choices=["wkt", "wkb", "flat"],
+        choices=["wkt", "wkb", "flat", "flat-bin"],
         help="The input geometry format. Defaults to WKT. Use 'flat' for better performance.",
     )
     parser.add_argument(
         "--output-format",
         "-O",
         default="wkt",
-        choices=["wkt", "wkb", "flat"],
+        choices=["wkt", "wkb", "flat", "flat-bin"],
         help="The output geometry format. Defaults to WKT. Use 'flat' for better performance.",
     )
     parser.add_argument(
@@ -90,18 +92,22 @@ def parse_args():
 
 
 def main(args):
-    if args.input_format != "flat":
+    if args.input_format == "flat":
+        tagged_points = deserialize_flat(args.input)
+    elif args.input_format == "flat-bin":
+        tagged_points = deserialize_flat_bin(args.input)
+    else:
         geometries = deserialize_geometries(args.input, args.input_format)
         tagged_points = flatten(geometries)
-    else:
-        tagged_points = deserialize_flat(args.input)
     transformed_points = project(tagged_points, args.kind, args.dimensions, args.scale)
 
-    if args.output_format != "flat":
+    if args.output_format == "flat":
+        serialize_flat(transformed_points, args.output)
+    elif args.output_format == "flat-bin":
+        serialize_flat_bin(transformed_points, args.output)
+    else:
         transformed_geoms = unflatten(transformed_points)
         serialize_geometries(transformed_geoms, args.output, args.output_format)
-    else:
-        serialize_flat(transformed_points, args.output)
 
 
 if __name__ == "__main__":